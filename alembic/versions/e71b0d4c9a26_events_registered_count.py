@@ -0,0 +1,37 @@
+"""events registered_count
+
+Revision ID: e71b0d4c9a26
+Revises: a3f1c29e7d54
+Create Date: 2026-10-17 11:24:53.671390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e71b0d4c9a26'
+down_revision: Union[str, None] = 'a3f1c29e7d54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('events', sa.Column('registered_count', sa.Integer(), server_default='0', nullable=False))
+    # Backfill from the existing registrations
+    op.execute(
+        """
+        UPDATE events
+        SET registered_count = counts.n
+        FROM (SELECT event_id, count(*) AS n FROM registrations GROUP BY event_id) AS counts
+        WHERE events.id = counts.event_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('events', 'registered_count')
@@ -0,0 +1,82 @@
+"""Move events that ended long ago, with their registrations, to the archive tables.
+
+Runs batches (see crud.archive_events) until nothing is left, pausing between
+them so autovacuum and live traffic keep up. Safe to run while the app is
+serving and from cron; concurrent runs skip each other's rows.
+
+    python -m app.archive --older-than-days 30 --batch-size 500
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import exc
+
+from app import crud
+from app.database import AsyncSessionLocal, dispose_engines, get_engine
+
+logger = logging.getLogger("app.archive")
+
+
+async def archive(older_than_days: float, batch_size: int = 500, max_registrations: int = 50_000,
+                  pause: float = 0.1, max_batches: int = 0, lock_timeout_ms: int = 2000,
+                  retries: int = 5) -> tuple:
+    """Archive batch after batch; returns (events, registrations) moved."""
+    get_engine()
+    ended_before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    events = registrations = batches = failures = 0
+    while not max_batches or batches < max_batches:
+        start = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as db:
+                event_ids, moved = await crud.archive_events(db, ended_before, batch_size, max_registrations,
+                                                             lock_timeout_ms)
+        except exc.DBAPIError as e:
+            # Lock timeouts and deadlocks with live registrations: back off and retry
+            failures += 1
+            if failures > retries:
+                raise
+            logger.warning("archive batch failed (%s), retrying", e.orig)
+            await asyncio.sleep(pause * 2 ** failures)
+            continue
+        failures = 0
+        if not event_ids:
+            break
+        batches += 1
+        events += len(event_ids)
+        registrations += moved
+        logger.info("archived %d events and %d registrations in %.0f ms",
+                    len(event_ids), moved, (time.perf_counter() - start) * 1000)
+        await asyncio.sleep(pause)
+    return events, registrations
+
+
+async def main(args) -> None:
+    try:
+        events, registrations = await archive(args.older_than_days, args.batch_size, args.max_registrations,
+                                              args.pause, args.max_batches, args.lock_timeout_ms)
+    finally:
+        await dispose_engines()
+    print(f"archived {events} events and {registrations} registrations")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--older-than-days", type=float, default=30,
+                        help="archive events that ended more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=500, help="events per batch (transaction)")
+    parser.add_argument("--max-registrations", type=int, default=50_000,
+                        help="stop adding events to a batch once it holds this many registrations")
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds to sleep between batches")
+    parser.add_argument("--max-batches", type=int, default=0, help="stop after this many batches (0: no limit)")
+    parser.add_argument("--lock-timeout-ms", type=int, default=2000)
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s %(message)s")
+    logger.setLevel(logging.INFO)
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        sys.exit(130)
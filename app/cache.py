@@ -0,0 +1,127 @@
+# In-process caching for hot read paths
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.config import get_settings
+
+MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a TTL.
+
+    Values may be None, which is how negative lookups (unknown ids) are
+    cached; ``get`` returns ``default`` (MISSING unless given) on a miss.
+    Not thread-safe: it is meant for a single event loop per worker.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 30.0, negative_ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > self.clock():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        ttl = self.negative_ttl if value is None else self.ttl
+        self._data[key] = (self.clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+# Events by id. Negative entries (unknown ids) live shorter so newly created
+# events on other workers show up quickly.
+event_cache = TTLCache(
+    maxsize=get_settings().event_cache_size,
+    ttl=get_settings().event_cache_ttl,
+    negative_ttl=get_settings().event_cache_negative_ttl,
+)
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives.
+
+    ``might_contain`` returning False means the key was never added (since
+    the last reset); True only means it probably was. Once more than
+    ``capacity`` keys have been added the filter clears itself rather than
+    let its false positive rate climb. Not thread-safe, like TTLCache.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        if self.count >= self.capacity:
+            self.clear()
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def might_contain(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def clear(self) -> None:
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+
+# Event ids that were full when last seen, so registrations for them can be
+# refused without a database round trip. Cancelling on this worker clears an
+# entry at once; the TTL bounds how long a seat freed elsewhere goes unseen.
+sold_out_events = TTLCache(maxsize=get_settings().event_cache_size, ttl=get_settings().sold_out_ttl)
+
+# "event_id:email" of registrations this worker has made or seen rejected as
+# duplicates. A miss proves nothing was seen; a hit still needs confirming.
+registration_filter = BloomFilter(capacity=get_settings().registration_filter_capacity)
+
+
+def evict_event(event_id: int) -> None:
+    """Forget what this worker cached about an event another worker changed."""
+    event_cache.invalidate(event_id)
+    sold_out_events.invalidate(event_id)
+
+
+def flush_events() -> None:
+    """Forget every cached event, e.g. after invalidations may have been missed."""
+    event_cache.clear()
+    sold_out_events.clear()
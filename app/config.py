@@ -0,0 +1,130 @@
+# Application settings read from the environment (and a .env file)
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    database_url: Optional[str]
+    # Read replicas for GET endpoints; unhealthy ones are skipped for a while
+    database_replica_urls: Tuple[str, ...] = ()
+    db_replica_retry_after: float = 5.0
+    # Engine and pool
+    db_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # asyncpg: prepared statements cached per connection, and a server-side
+    # statement_timeout in milliseconds (0 disables it)
+    db_statement_cache_size: int = 100
+    db_statement_timeout_ms: int = 0
+    # Pool connections opened (with the hot statements prepared) on startup
+    db_warmup_connections: int = 2
+    # Event cache (app.cache)
+    event_cache_size: int = 10_000
+    event_cache_ttl: float = 30.0
+    event_cache_negative_ttl: float = 5.0
+    # Registration fast path (app.cache): how long an event stays marked sold
+    # out, and how many registrations the duplicate filter holds before reset
+    sold_out_ttl: float = 5.0
+    registration_filter_capacity: int = 1_000_000
+    # Cross-worker invalidation (app.invalidation): writes NOTIFY this channel
+    # and, when listening is on, each worker evicts the events other workers
+    # changed
+    invalidation_channel: str = "cache_invalidation"
+    invalidation_listen: bool = True
+    invalidation_keepalive: float = 10.0
+    # Live seat updates (app.live): window in which changes to an event are
+    # merged into one message, and seconds between keepalive comments
+    live_interval: float = 0.5
+    live_keepalive: float = 15.0
+    # Adaptive concurrency limits (app.limits): registration writes and
+    # listing reads each get a limit that starts at *_limit and adapts to keep
+    # latency under *_latency_target seconds; requests over it get a 503
+    concurrency_limits: bool = False
+    concurrency_registration_limit: int = 20
+    concurrency_registration_latency_target: float = 0.1
+    concurrency_listing_limit: int = 40
+    concurrency_listing_latency_target: float = 0.25
+    concurrency_min_limit: int = 2
+    concurrency_max_limit: int = 200
+    concurrency_retry_after: int = 1
+    # Idempotency-Key (app.idempotency): responses kept per worker for replays
+    idempotency_cache_size: int = 100_000
+    idempotency_ttl: float = 86_400.0
+    # Warn (QueryBudgetWarning) when a request runs more SQL statements than
+    # this; 0 disables the check
+    sql_query_budget: int = 0
+    # Registration intake (app.intake): POST /events/{id}/register answers 202
+    # with a ticket and a background writer registers in batches
+    registration_intake: bool = False
+    intake_queue_size: int = 10_000
+    intake_batch_size: int = 500
+    intake_ticket_ttl: float = 600.0
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Read the environment, after filling in unset variables from a .env file."""
+        load_dotenv()
+        return cls(
+            database_url=os.getenv("DATABASE_URL"),
+            database_replica_urls=tuple(
+                url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+            ),
+            db_replica_retry_after=float(os.getenv("DB_REPLICA_RETRY_AFTER", "5")),
+            db_echo=_env_bool("DB_ECHO", False),
+            db_pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            db_pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            db_pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+            db_pool_pre_ping=_env_bool("DB_POOL_PRE_PING", True),
+            db_statement_cache_size=int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")),
+            db_statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0")),
+            db_warmup_connections=int(os.getenv("DB_WARMUP_CONNECTIONS", "2")),
+            event_cache_size=int(os.getenv("EVENT_CACHE_SIZE", "10000")),
+            event_cache_ttl=float(os.getenv("EVENT_CACHE_TTL", "30")),
+            event_cache_negative_ttl=float(os.getenv("EVENT_CACHE_NEGATIVE_TTL", "5")),
+            sold_out_ttl=float(os.getenv("SOLD_OUT_TTL", "5")),
+            registration_filter_capacity=int(os.getenv("REGISTRATION_FILTER_CAPACITY", "1000000")),
+            invalidation_channel=os.getenv("INVALIDATION_CHANNEL", "cache_invalidation"),
+            invalidation_listen=_env_bool("INVALIDATION_LISTEN", True),
+            invalidation_keepalive=float(os.getenv("INVALIDATION_KEEPALIVE", "10")),
+            live_interval=float(os.getenv("LIVE_INTERVAL", "0.5")),
+            live_keepalive=float(os.getenv("LIVE_KEEPALIVE", "15")),
+            concurrency_limits=_env_bool("CONCURRENCY_LIMITS", False),
+            concurrency_registration_limit=int(os.getenv("CONCURRENCY_REGISTRATION_LIMIT", "20")),
+            concurrency_registration_latency_target=float(
+                os.getenv("CONCURRENCY_REGISTRATION_LATENCY_TARGET", "0.1")),
+            concurrency_listing_limit=int(os.getenv("CONCURRENCY_LISTING_LIMIT", "40")),
+            concurrency_listing_latency_target=float(os.getenv("CONCURRENCY_LISTING_LATENCY_TARGET", "0.25")),
+            concurrency_min_limit=int(os.getenv("CONCURRENCY_MIN_LIMIT", "2")),
+            concurrency_max_limit=int(os.getenv("CONCURRENCY_MAX_LIMIT", "200")),
+            concurrency_retry_after=int(os.getenv("CONCURRENCY_RETRY_AFTER", "1")),
+            idempotency_cache_size=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "100000")),
+            idempotency_ttl=float(os.getenv("IDEMPOTENCY_TTL", "86400")),
+            sql_query_budget=int(os.getenv("SQL_QUERY_BUDGET", "0")),
+            registration_intake=_env_bool("REGISTRATION_INTAKE", False),
+            intake_queue_size=int(os.getenv("INTAKE_QUEUE_SIZE", "10000")),
+            intake_batch_size=int(os.getenv("INTAKE_BATCH_SIZE", "500")),
+            intake_ticket_ttl=float(os.getenv("INTAKE_TICKET_TTL", "600")),
+        )
+
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The settings, read from the environment (and .env) on first use rather than at import."""
+    return Settings.from_env()
@@ -1,30 +1,207 @@
 # CRUD operations for events and attendees will be defined here
+import re
 from datetime import datetime
-from typing import Optional, Sequence
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import func
+from sqlalchemy import any_, bindparam, delete, exists, false, func, literal, text, true, update, Integer, Row, String
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from app.models import Event, Attendee, Registration
-from app.schemas import EventCreate, AttendeeCreate
+from app.cache import MISSING, event_cache, registration_filter, sold_out_events
+from app.invalidation import publish
+from app.models import Event, Attendee, Registration, ArchivedEvent, ArchivedRegistration, SEARCH_CONFIG
+from app.schemas import EventCreate, AttendeeCreate, RegistrationCreate
 
 
+class EventFullError(ValueError):
+    pass
+
+
+class AlreadyRegisteredError(ValueError):
+    pass
+
+
+# Every UPDATE of an event row includes these so cached listings revalidate
+_BUMP_VERSION = {"version": Event.version + 1, "updated_at": func.now()}
+
 async def create_event(db: AsyncSession, event: EventCreate) -> Event:
     db_event = Event(**event.dict())
     db.add(db_event)
+    await db.flush()
+    # The id may have been cached as unknown, here and on other workers
+    await db.execute(select(publish(db_event.id)))
     await db.commit()
     await db.refresh(db_event)
+    event_cache.invalidate(db_event.id)
     return db_event
 
-async def get_events(db: AsyncSession) -> Sequence[Event]:
-    result = await db.execute(select(Event).where(Event.start_time >= datetime.now()).order_by(Event.start_time))
-    return result.scalars().all()
+EVENT_SORTS = {
+    "start_time": (Event.start_time, Event.id),
+    "-start_time": (Event.start_time.desc(), Event.id.desc()),
+    "name": (Event.name, Event.id),
+    "-name": (Event.name.desc(), Event.id.desc()),
+}
+
+# Columns behind each EventOut / AttendeeOut field, for reads narrowed with ``fields``
+EVENT_FIELD_COLUMNS = {
+    "id": (Event.id,),
+    "name": (Event.name,),
+    "location": (Event.location,),
+    "start_time": (Event.start_time,),
+    "end_time": (Event.end_time,),
+    "max_capacity": (Event.max_capacity,),
+    "seats_remaining": (Event.max_capacity, Event.registered_count),
+}
+ATTENDEE_FIELD_COLUMNS = {
+    "id": (Attendee.id,),
+    "name": (Attendee.name,),
+    "email": (Attendee.email,),
+}
+
+def _field_columns(field_columns: dict, fields: Sequence[str], *required) -> list:
+    """Columns for ``fields`` plus ``required``, each once."""
+    columns = {column.key: column for column in required}
+    for field in fields:
+        columns.update((column.key, column) for column in field_columns[field])
+    return list(columns.values())
+
+def _event_select(fields: Optional[Sequence[str]]):
+    # Sparse reads still return id and version, which listings put in their ETag
+    if fields is None:
+        return select(Event)
+    return select(*_field_columns(EVENT_FIELD_COLUMNS, fields, Event.id, Event.version))
+
+def search_terms(text: str) -> Optional[str]:
+    """Turn free text into a prefix-matching tsquery: "conf hall" -> "conf:* & hall:*"."""
+    words = re.findall(r"\w+", text.lower())
+    return " & ".join(f"{word}:*" for word in words) or None
+
+def _upcoming_events(query, available_only: bool = False, q: Optional[str] = None, location: Optional[str] = None,
+                     starts_after: Optional[datetime] = None, starts_before: Optional[datetime] = None):
+    query = query.where(Event.start_time >= datetime.now())
+    if available_only:
+        query = query.where(Event.registered_count < Event.max_capacity)
+    if starts_after is not None:
+        query = query.where(Event.start_time >= starts_after)
+    if starts_before is not None:
+        query = query.where(Event.start_time <= starts_before)
+    if location:
+        query = query.where(func.lower(Event.location) == location.lower())
+    if q:
+        terms = search_terms(q)
+        # Text without a single word matches nothing, rather than dropping the filter
+        query = query.where(Event.search_vector.op("@@")(func.to_tsquery(SEARCH_CONFIG, terms)) if terms else false())
+    return query
+
+async def get_events(db: AsyncSession, skip: int = 0, limit: int = 10, available_only: bool = False,
+                     sort: str = "start_time", fields: Optional[Sequence[str]] = None, **filters) -> Sequence[Event]:
+    """Upcoming events, one page. ``filters`` are q, location, starts_after and starts_before.
+
+    With ``fields`` (EVENT_FIELD_COLUMNS keys) only the columns those need,
+    plus id and version, are selected and rows are returned instead of Events.
+    """
+    query = (
+        _upcoming_events(_event_select(fields), available_only, **filters)
+        .order_by(*EVENT_SORTS[sort])
+        .offset(skip)
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return result.scalars().all() if fields is None else result.all()
+
+async def count_events(db: AsyncSession, available_only: bool = False, **filters) -> int:
+    result = await db.execute(_upcoming_events(select(func.count(Event.id)), available_only, **filters))
+    return result.scalar()
 
 async def get_event(db: AsyncSession, event_id: int) -> Optional[Event]:
     result = await db.execute(select(Event).where(Event.id == event_id))
     return result.scalar_one_or_none()
 
+async def get_events_by_ids(db: AsyncSession, ids: Sequence[int],
+                            fields: Optional[Sequence[str]] = None) -> Sequence[Event]:
+    """Events with the given ids in one ``id = ANY(:ids)`` query, in no particular order; unknown ids are skipped.
+
+    ``fields`` narrows the columns as in get_events.
+    """
+    result = await db.execute(
+        _event_select(fields).where(Event.id == any_(bindparam("ids", list(ids), type_=ARRAY(Integer))))
+    )
+    return result.scalars().all() if fields is None else result.all()
+
+async def get_event_cached(db: AsyncSession, event_id: int) -> Optional[Event]:
+    """Read-through variant of get_event backed by event_cache.
+
+    Returns a detached Event (or None for unknown ids, which are cached too
+    when read on the primary, see mark_unknown_event). Writes that touch an
+    event row invalidate its entry. Sessions opened for read-your-writes skip
+    the cached value and refresh it from the primary.
+    """
+    event = MISSING if db.info.get("read_your_writes") else event_cache.get(event_id)
+    if event is MISSING:
+        event = await get_event(db, event_id)
+        if event is None:
+            mark_unknown_event(db, event_id)
+        else:
+            db.expunge(event)
+            event_cache.set(event_id, event)
+    return event
+
+async def get_event_versions(db: AsyncSession, skip: int = 0, limit: int = 10, available_only: bool = False,
+                             sort: str = "start_time", **filters) -> Sequence[Row]:
+    """(id, version) of the events get_events would return, without loading the rows."""
+    result = await db.execute(
+        _upcoming_events(select(Event.id, Event.version), available_only, **filters)
+        .order_by(*EVENT_SORTS[sort])
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.all()
+
+async def get_event_version(db: AsyncSession, event_id: int, archived: bool = False) -> Optional[Row]:
+    """(version, updated_at, registered_count, max_capacity) of an event, read fresh, or None if it doesn't exist.
+
+    With ``archived`` the event is looked up in the archive instead.
+    """
+    model = ArchivedEvent if archived else Event
+    result = await db.execute(
+        select(model.version, model.updated_at, model.registered_count, model.max_capacity)
+        .where(model.id == event_id)
+    )
+    return result.one_or_none()
+
+def is_unknown_event(event_id: int) -> bool:
+    """True only if event_id is cached as not existing; never queries the database."""
+    return event_cache.get(event_id, MISSING) is None
+
+def mark_unknown_event(db: AsyncSession, event_id: int) -> None:
+    """Cache event_id as not existing, for is_unknown_event; creating the event clears it.
+
+    Misses read on a replica are not cached: the registration path checks the
+    same entries, and a replica lagging behind would hide a new event from it.
+    """
+    if not db.info.get("replica"):
+        event_cache.set(event_id, None)
+
+def is_sold_out(event_id: int) -> bool:
+    """True if event_id was full when this worker last registered for it; never queries the database."""
+    return sold_out_events.get(event_id, False)
+
+def _registration_key(event_id: int, email: str) -> str:
+    return f"{event_id}:{email}"
+
+def maybe_registered(event_id: int, email: str) -> bool:
+    """False if this worker has certainly not seen the registration; True needs is_registered to confirm."""
+    return registration_filter.might_contain(_registration_key(event_id, email))
+
+async def is_registered(db: AsyncSession, event_id: int, email: str) -> bool:
+    result = await db.execute(
+        select(Registration.id)
+        .join(Attendee, Registration.attendee_id == Attendee.id)
+        .where(Registration.event_id == event_id, Attendee.email == email)
+    )
+    return result.first() is not None
+
 async def get_attendee_by_email(db: AsyncSession, email: str) -> Optional[Attendee]:
     result = await db.execute(select(Attendee).where(Attendee.email == email))
     return result.scalar_one_or_none()
@@ -36,36 +213,329 @@ async def create_attendee(db: AsyncSession, attendee: AttendeeCreate) -> Attende
     await db.refresh(db_attendee)
     return db_attendee
 
-async def register_attendee(db: AsyncSession, event: Event, attendee: Attendee) -> Registration:
-    # Check for overbooking
-    result = await db.execute(select(func.count(Registration.id)).where(Registration.event_id == event.id))
-    count = result.scalar()
-    if count >= event.max_capacity:
-        raise ValueError("Event is fully booked.")
-    # Check for duplicate registration
-    result = await db.execute(select(Registration).where(Registration.event_id == event.id, Registration.attendee_id == attendee.id))
-    if result.scalar_one_or_none():
-        raise ValueError("Attendee already registered for this event.")
-    db_registration = Registration(event_id=event.id, attendee_id=attendee.id)
-    db.add(db_registration)
+async def register_attendee(db: AsyncSession, event_id: int, reg: RegistrationCreate) -> Optional[Registration]:
+    """Upsert the attendee and register them for the event in one transaction.
+
+    Returns None if the event does not exist and raises EventFullError or
+    AlreadyRegisteredError (both ValueErrors) if it is fully booked or the
+    attendee is already registered.
+    """
+    # 1. Lock the event row and upsert the attendee. The lock serializes
+    #    registrations per event, so the registered_count we read stays valid
+    #    until commit. DO UPDATE (rather than DO NOTHING) makes RETURNING
+    #    yield existing ids.
+    event = (
+        select(Event.id, Event.max_capacity, Event.registered_count)
+        .where(Event.id == event_id)
+        .with_for_update()
+        .cte("event")
+    )
+    upsert = pg_insert(Attendee).from_select(
+        ["name", "email"],
+        select(literal(reg.name), literal(reg.email)).select_from(event),
+    )
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[Attendee.email],
+        set_={"email": upsert.excluded.email},
+    ).returning(Attendee.id).cte("attendee")
+    result = await db.execute(
+        select(event.c.max_capacity, event.c.registered_count, upsert.c.id)
+        .select_from(event.join(upsert, true()))
+    )
+    row = result.one_or_none()
+    if row is None:
+        await db.rollback()
+        event_cache.set(event_id, None)
+        return None
+    max_capacity, registered_count, attendee_id = row
+    if registered_count >= max_capacity:
+        await db.rollback()
+        sold_out_events.set(event_id, True)
+        raise EventFullError("Event is fully booked.")
+
+    # 2. Insert the registration and bump the counter only if the insert
+    #    actually happened; a conflict means the attendee is already registered.
+    insert_registration = pg_insert(Registration).values(
+        event_id=event_id, attendee_id=attendee_id
+    ).on_conflict_do_nothing(constraint='_event_attendee_uc').returning(Registration.id).cte("registration")
+    bump = (
+        update(Event)
+        .where(Event.id == event_id, exists(select(insert_registration.c.id)))
+        .values(registered_count=Event.registered_count + 1, **_BUMP_VERSION)
+        .returning(Event.id)
+        .cte("bump")
+    )
+    # The notification is only delivered if the registration commits
+    result = await db.execute(
+        select(select(insert_registration.c.id).scalar_subquery(), select(bump.c.id).scalar_subquery(),
+               publish(event_id))
+    )
+    registration_id, _, _ = result.one()
+    if registration_id is None:
+        await db.rollback()
+        registration_filter.add(_registration_key(event_id, reg.email))
+        raise AlreadyRegisteredError("Attendee already registered for this event.")
     await db.commit()
-    await db.refresh(db_registration)
-    return db_registration
+    event_cache.invalidate(event_id)
+    registration_filter.add(_registration_key(event_id, reg.email))
+    if registered_count + 1 >= max_capacity:
+        sold_out_events.set(event_id, True)
+    return Registration(id=registration_id, event_id=event_id, attendee_id=attendee_id)
+
+BULK_BATCH_SIZE = 1000
+
+async def bulk_register_attendees(db: AsyncSession, event_id: int, regs: Sequence[RegistrationCreate]) -> Optional[Dict[str, Tuple[str, Optional[int], Optional[int]]]]:
+    """Register many attendees for one event in a single transaction.
 
-async def get_attendees_for_event(db: AsyncSession, event_id: int, skip: int = 0, limit: int = 10) -> Sequence[Attendee]:
+    ``regs`` must have unique emails and is processed in order: once the
+    event is full, the remaining new registrations are rejected. Returns
+    ``{email: (status, registration_id, attendee_id)}`` with status one of
+    "created", "duplicate" or "full", or None if the event does not exist.
+    """
+    # Lock the event row for the whole import so capacity is enforced atomically
     result = await db.execute(
-        select(Attendee)
-        .join(Registration, Registration.attendee_id == Attendee.id)
-        .where(Registration.event_id == event_id)
-        .offset(skip)
-        .limit(limit)
+        select(Event.max_capacity, Event.registered_count).where(Event.id == event_id).with_for_update()
+    )
+    row = result.one_or_none()
+    if row is None:
+        await db.rollback()
+        event_cache.set(event_id, None)
+        return None
+    max_capacity, registered_count = row
+
+    emails = [reg.email for reg in regs]
+    outcome = {}
+    for start in range(0, len(emails), BULK_BATCH_SIZE):
+        result = await db.execute(
+            select(Attendee.email, Attendee.id, Registration.id)
+            .join(Registration, Registration.attendee_id == Attendee.id)
+            .where(
+                Registration.event_id == event_id,
+                Attendee.email == any_(bindparam("emails", emails[start:start + BULK_BATCH_SIZE], type_=ARRAY(String))),
+            )
+        )
+        for email, attendee_id, registration_id in result:
+            outcome[email] = ("duplicate", registration_id, attendee_id)
+
+    # Seats go to new registrations in request order; only those get an attendee row
+    seats = max(max_capacity - registered_count, 0)
+    accepted = []
+    for reg in regs:
+        if reg.email in outcome:
+            continue
+        if len(accepted) < seats:
+            accepted.append(reg)
+        else:
+            outcome[reg.email] = ("full", None, None)
+
+    # Write in email order so concurrent imports sharing attendees lock their rows in the same order
+    accepted.sort(key=lambda reg: reg.email)
+    created = 0
+    for start in range(0, len(accepted), BULK_BATCH_SIZE):
+        batch = accepted[start:start + BULK_BATCH_SIZE]
+        upsert = pg_insert(Attendee).values([{"name": reg.name, "email": reg.email} for reg in batch])
+        result = await db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[Attendee.email],
+                set_={"email": upsert.excluded.email},
+            ).returning(Attendee.id, Attendee.email)
+        )
+        attendee_ids = {email: attendee_id for attendee_id, email in result}
+        result = await db.execute(
+            pg_insert(Registration)
+            .values([{"event_id": event_id, "attendee_id": attendee_ids[reg.email]} for reg in batch])
+            .on_conflict_do_nothing(constraint='_event_attendee_uc')
+            .returning(Registration.id, Registration.attendee_id)
+        )
+        registration_ids = {attendee_id: registration_id for registration_id, attendee_id in result}
+        for reg in batch:
+            attendee_id = attendee_ids[reg.email]
+            registration_id = registration_ids.get(attendee_id)
+            outcome[reg.email] = ("created" if registration_id else "duplicate", registration_id, attendee_id)
+        created += len(registration_ids)
+
+    if created:
+        await db.execute(
+            update(Event)
+            .where(Event.id == event_id)
+            .values(registered_count=Event.registered_count + created, **_BUMP_VERSION)
+        )
+        await db.execute(select(publish(event_id)))
+    await db.commit()
+    if created:
+        event_cache.invalidate(event_id)
+    if registered_count + created >= max_capacity:
+        sold_out_events.set(event_id, True)
+    for email, (row_status, _, _) in outcome.items():
+        if row_status != "full":
+            registration_filter.add(_registration_key(event_id, email))
+    return outcome
+
+async def cancel_registration(db: AsyncSession, event_id: int, attendee_id: int) -> bool:
+    """Delete a registration and release its seat. Returns False if there was none."""
+    # Lock the event before the registration row, in the same order as
+    # register_attendee, so a cancel racing a re-registration can't deadlock
+    locked = await db.execute(select(Event.id).where(Event.id == event_id).with_for_update())
+    if locked.scalar_one_or_none() is None:
+        await db.rollback()
+        return False
+    deleted = (
+        delete(Registration)
+        .where(Registration.event_id == event_id, Registration.attendee_id == attendee_id)
+        .returning(Registration.id)
+        .cte("deleted")
+    )
+    release = (
+        update(Event)
+        .where(Event.id == event_id, exists(select(deleted.c.id)))
+        .values(registered_count=Event.registered_count - 1, **_BUMP_VERSION)
+        .returning(Event.id)
+        .cte("release")
     )
-    return result.scalars().all()
+    result = await db.execute(
+        select(select(deleted.c.id).scalar_subquery(), select(release.c.id).scalar_subquery(),
+               publish(event_id))
+    )
+    registration_id, _, _ = result.one()
+    if registration_id is None:
+        # Nothing changed; rolling back also drops the notification
+        await db.rollback()
+        return False
+    await db.commit()
+    event_cache.invalidate(event_id)
+    sold_out_events.invalidate(event_id)
+    return True
+
+async def get_attendees_for_event(db: AsyncSession, event_id: int, skip: int = 0, limit: int = 10, after_id: Optional[int] = None,
+                                  archived: bool = False, fields: Optional[Sequence[str]] = None) -> Sequence[Row]:
+    """Return (Attendee, registration id) rows in registration order.
+
+    With ``after_id`` the page starts right after that registration (keyset
+    pagination) and ``skip`` is ignored, so deep pages cost the same as the
+    first. With ``archived`` the registrations come from the archive. With
+    ``fields`` (ATTENDEE_FIELD_COLUMNS keys) rows hold just those columns,
+    still followed by the registration id.
+    """
+    model = ArchivedRegistration if archived else Registration
+    columns = [Attendee] if fields is None else _field_columns(ATTENDEE_FIELD_COLUMNS, fields)
+    query = (
+        select(*columns, model.id.label("registration_id"))
+        .join(model, model.attendee_id == Attendee.id)
+        .where(model.event_id == event_id)
+    )
+    if after_id is not None:
+        query = query.where(model.id > after_id)
+    else:
+        query = query.offset(skip)
+    result = await db.execute(query.order_by(model.id).limit(limit))
+    return result.all()
+
+async def stream_attendees_for_event(db: AsyncSession, event_id: int, batch_size: int = 1000,
+                                     archived: bool = False) -> AsyncIterator[Sequence[Row]]:
+    """Yield batches of (id, name, email) rows in registration order from a server-side cursor."""
+    model = ArchivedRegistration if archived else Registration
+    result = await db.stream(
+        select(Attendee.id, Attendee.name, Attendee.email)
+        .join(model, model.attendee_id == Attendee.id)
+        .where(model.event_id == event_id)
+        .order_by(model.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for batch in result.partitions():
+        yield batch
 
 async def count_attendees_for_event(db: AsyncSession, event_id: int) -> int:
+    result = await db.execute(select(Event.registered_count).where(Event.id == event_id))
+    return result.scalar() or 0
+
+async def archive_events(db: AsyncSession, ended_before: datetime, batch_size: int = 500,
+                         max_registrations: int = 50_000, lock_timeout_ms: int = 2000) -> Tuple[List[int], int]:
+    """Move one batch of events that ended before ``ended_before`` into the archive tables.
+
+    Events and their registrations are deleted from the hot tables and
+    inserted into archived_events / archived_registrations by a single
+    statement, and other workers are notified to evict them. A batch holds
+    at most ``batch_size`` events and stops adding events once it has
+    ``max_registrations`` registrations (but always takes one), which
+    bounds how long the transaction runs. Events locked by a registration
+    in progress are skipped until a later batch, and ``lock_timeout_ms``
+    keeps the batch from queueing behind other locks: it fails instead.
+
+    Returns the archived event ids (empty when nothing is left to archive)
+    and the number of registrations moved.
+    """
+    await db.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+    # end_time < cutoff implies start_time < cutoff; filtering on both lets
+    # the scan use ix_events_start_time_id instead of a new index
+    locked = (
+        select(Event.id, Event.registered_count)
+        .where(Event.start_time < ended_before, Event.end_time < ended_before)
+        .order_by(Event.start_time, Event.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("locked")
+    )
+    running = select(
+        locked.c.id,
+        (func.sum(locked.c.registered_count).over(order_by=locked.c.id) - locked.c.registered_count).label("before"),
+    ).subquery("running")
+    batch = select(running.c.id).where(running.c.before < max_registrations).cte("batch")
+
+    columns = ["id", "name", "location", "start_time", "end_time", "max_capacity", "registered_count",
+               "version", "updated_at"]
+    moved_events = (
+        delete(Event)
+        .where(Event.id.in_(select(batch.c.id)))
+        .returning(*(getattr(Event, column) for column in columns))
+        .cte("moved_events")
+    )
+    archived = (
+        pg_insert(ArchivedEvent)
+        .from_select(columns, select(*(moved_events.c[column] for column in columns)))
+        .returning(ArchivedEvent.id)
+        .cte("archived")
+    )
+    # Deleted here rather than by the foreign key's cascade so they can be copied
+    moved_registrations = (
+        delete(Registration)
+        .where(Registration.event_id.in_(select(batch.c.id)))
+        .returning(Registration.id, Registration.event_id, Registration.attendee_id)
+        .cte("moved_registrations")
+    )
+    archived_registrations = (
+        pg_insert(ArchivedRegistration)
+        .from_select(["id", "event_id", "attendee_id"], select(moved_registrations))
+        .returning(ArchivedRegistration.id)
+        .cte("archived_regs")
+    )
+    notified = select(publish(archived.c.id).label("notified")).cte("notified")
     result = await db.execute(
-        select(func.count(Attendee.id))
-        .join(Registration, Registration.attendee_id == Attendee.id)
-        .where(Registration.event_id == event_id)
+        select(
+            archived.c.id,
+            select(func.count()).select_from(archived_registrations).scalar_subquery(),
+            select(func.count()).select_from(notified).scalar_subquery(),
+        )
     )
-    return result.scalar() 
\ No newline at end of file
+    rows = result.all()
+    await db.commit()
+    event_ids = [event_id for event_id, _, _ in rows]
+    for event_id in event_ids:
+        event_cache.invalidate(event_id)
+        sold_out_events.invalidate(event_id)
+    return event_ids, rows[0][1] if rows else 0
+
+async def prepare_statements(db: AsyncSession) -> None:
+    """Run the hot read queries once, matching nothing, so the connection has them prepared.
+
+    Used by database.warm_up on startup. Writes are left out: they can't run
+    without side effects and are prepared by the first registration instead.
+    """
+    await get_events(db)
+    await count_events(db)
+    await get_event_versions(db)
+    await get_event(db, 0)
+    await get_events_by_ids(db, [0])
+    await get_event_version(db, 0)
+    await is_registered(db, 0, "")
+    await get_attendees_for_event(db, 0, limit=11)
+    await get_attendees_for_event(db, 0, limit=11, after_id=0)
@@ -1,23 +1,211 @@
-# Database connection and session setup will be here 
+# Database connection and session setup will be here
 
-import os
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Sequence
+
+from fastapi import Header
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import Settings, get_settings
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            # Plain attribute updates: the pool is only used from the event loop thread
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
 
-load_dotenv()
+def create_engine(config: Optional[Settings] = None, url: Optional[str] = None) -> AsyncEngine:
+    """Build an async engine from settings, for the primary unless another url is given."""
+    config = config or get_settings()
+    url = make_url(url or config.database_url)
+    kwargs = {
+        "echo": config.db_echo,
+        "future": True,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config.db_pool_size,
+        "max_overflow": config.db_max_overflow,
+        "pool_timeout": config.db_pool_timeout,
+        "pool_recycle": config.db_pool_recycle,
+        "pool_pre_ping": config.db_pool_pre_ping,
+    }
+    if url.get_driver_name() == "asyncpg":
+        server_settings = {}
+        if config.db_statement_timeout_ms:
+            server_settings["statement_timeout"] = str(config.db_statement_timeout_ms)
+        kwargs["connect_args"] = {
+            "prepared_statement_cache_size": config.db_statement_cache_size,
+            "server_settings": server_settings,
+        }
+    return create_async_engine(url, **kwargs)
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-print(DATABASE_URL)
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+
+class ReplicaSet:
+    """Round-robin over read replicas, skipping ones that recently failed."""
+
+    def __init__(self, engines: Sequence[Any], retry_after: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.engines = list(engines)
+        self.retry_after = retry_after
+        self.clock = clock
+        self._next = 0
+        self._down_until: Dict[int, float] = {}
+
+    def pick(self) -> Optional[Any]:
+        """Next healthy replica, or None if there are none (use the primary)."""
+        now = self.clock()
+        for _ in range(len(self.engines)):
+            index = self._next
+            self._next = (self._next + 1) % len(self.engines)
+            if self._down_until.get(index, 0) <= now:
+                return self.engines[index]
+        return None
+
+    def mark_down(self, engine: Any) -> None:
+        self._down_until[self.engines.index(engine)] = self.clock() + self.retry_after
+
+
+# Created by init_engines, normally from the application's lifespan, so that
+# importing this module neither reads the settings (or .env) nor opens anything
+engine: Optional[AsyncEngine] = None
+replicas = ReplicaSet([])
 
 AsyncSessionLocal = sessionmaker(
-    bind=engine,
     class_=AsyncSession,
     expire_on_commit=False
 )
 
+
+def init_engines(config: Optional[Settings] = None) -> AsyncEngine:
+    """Create the primary and replica engines from ``config`` and bind AsyncSessionLocal to the primary."""
+    global engine, replicas
+    config = config or get_settings()
+    engine = create_engine(config)
+    replicas = ReplicaSet(
+        [create_engine(config, url=url) for url in config.database_replica_urls],
+        retry_after=config.db_replica_retry_after,
+    )
+    AsyncSessionLocal.configure(bind=engine)
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """The primary engine, created from settings on first use outside the app (scripts, benchmarks)."""
+    return engine if engine is not None else init_engines()
+
+
+async def dispose_engines() -> None:
+    global engine
+    if engine is None:
+        return
+    for replica in replicas.engines:
+        await replica.dispose()
+    await engine.dispose()
+    engine = None
+
+
+async def warm_up(warm_engine: AsyncEngine, connections: int,
+                  prepare: Optional[Callable[[AsyncSession], Awaitable[None]]] = None) -> int:
+    """Open ``connections`` pooled connections at once and run ``prepare`` on each.
+
+    Opening them together makes the pool keep them all, so the first requests
+    don't pay for connecting; with asyncpg, running the hot statements once
+    leaves them in each connection's prepared statement cache. Returns how
+    many connections were opened.
+    """
+    opened = await asyncio.gather(*(warm_engine.connect() for _ in range(connections)), return_exceptions=True)
+    conns = [conn for conn in opened if not isinstance(conn, BaseException)]
+    try:
+        for error in opened:
+            if isinstance(error, BaseException):
+                raise error
+        if prepare is not None:
+            for conn in conns:
+                async with AsyncSession(bind=conn) as session:
+                    await prepare(session)
+                await conn.rollback()
+        return len(conns)
+    finally:
+        for conn in conns:
+            await conn.close()
+
+
 # Dependency for FastAPI
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session 
\ No newline at end of file
+        yield session
+
+
+async def _replica_session() -> Optional[AsyncSession]:
+    """Open a session on a healthy replica, marking replicas that fail to connect as down."""
+    while (replica := replicas.pick()) is not None:
+        session = AsyncSessionLocal(bind=replica)
+        try:
+            await session.connection()
+            return session
+        except (OSError, exc.DBAPIError, exc.TimeoutError):
+            await session.close()
+            replicas.mark_down(replica)
+    return None
+
+
+@asynccontextmanager
+async def read_session(use_primary: bool = False) -> AsyncIterator[AsyncSession]:
+    """Session for read-only work: a replica when one is healthy, otherwise the primary."""
+    replica = None if use_primary else await _replica_session()
+    async with (replica or AsyncSessionLocal()) as session:
+        # Tells read-through caches to go to the database (see crud.get_event_cached)
+        session.info["read_your_writes"] = use_primary
+        # A lagging replica may not have a new event yet (see crud.mark_unknown_event)
+        session.info["replica"] = replica is not None
+        yield session
+
+
+# Dependency for FastAPI read endpoints. Send "X-Read-Your-Writes: 1" to read
+# from the primary, e.g. to list attendees right after registering.
+async def get_read_db(x_read_your_writes: Optional[str] = Header(None)):
+    use_primary = x_read_your_writes is not None and x_read_your_writes.lower() in ("1", "true", "yes")
+    async with read_session(use_primary) as session:
+        yield session
+
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, float]:
+    """Snapshot of an engine's connection pool for the internal stats endpoint."""
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool reports overflow relative to pool_size (negative while under it)
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": pool.checkouts,
+        "checkout_timeouts": pool.checkout_timeouts,
+        "avg_wait_ms": pool.total_wait / pool.checkouts * 1000 if pool.checkouts else 0.0,
+        "max_wait_ms": pool.max_wait * 1000,
+    }
@@ -0,0 +1,188 @@
+# Idempotency-Key support: replay the stored response of a retried POST
+import asyncio
+import hashlib
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import orjson
+
+from app.cache import TTLCache
+from app.metrics import IDEMPOTENCY
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+
+# (method, path pattern) of the endpoints that honour the header; POST /events
+# is only the redirect to /events/ and is left alone
+IDEMPOTENT_ROUTES: Tuple[Tuple[str, "re.Pattern"], ...] = (
+    ("POST", re.compile(r"/events/")),
+    ("POST", re.compile(r"/events/\d+/register")),
+)
+
+# Per-request headers that would be misleading on a replay
+_NOT_STORED = {b"server-timing", b"content-length"}
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: bytes
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+
+class IdempotencyStore:
+    """Responses by Idempotency-Key, plus the requests still working on theirs.
+
+    Held in this worker's memory (a TTLCache, so bounded and expiring), like
+    intake tickets: a retry reaching another worker is served normally, so
+    route on the header (or use sticky sessions) when running several.
+    """
+
+    def __init__(self, maxsize: int = 100_000, ttl: float = 86_400.0):
+        self.responses = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.in_flight: Dict[str, Tuple[bytes, asyncio.Event]] = {}
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        return self.responses.get(key, None)
+
+    def begin(self, key: str, fingerprint: bytes) -> None:
+        self.in_flight[key] = (fingerprint, asyncio.Event())
+
+    def finish(self, key: str, response: Optional[StoredResponse]) -> None:
+        """Store the outcome (None: nothing to replay) and wake the duplicates waiting on it."""
+        if response is not None:
+            self.responses.set(key, response)
+        _, done = self.in_flight.pop(key)
+        done.set()
+
+
+def fingerprint(method: str, path: str, body: bytes) -> bytes:
+    return hashlib.blake2b(b"%s %s\n%s" % (method.encode(), path.encode(), body), digest_size=16).digest()
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware answering retried POSTs from the first attempt's response.
+
+    The first request with a given ``Idempotency-Key`` runs as usual and its
+    response is stored if it is a 2xx or 4xx: a redirect points the client at
+    where to send the key, and a 5xx (a 503 from load shedding among them)
+    should be free to retry. Requests repeating the key while it runs wait for it, and later ones get the stored response with an
+    ``Idempotent-Replayed: true`` header; neither reaches the endpoint or the
+    database. Reusing a key for a different path or body is a 422.
+    """
+
+    def __init__(self, app, store: IdempotencyStore, routes: Sequence[Tuple[str, "re.Pattern"]] = IDEMPOTENT_ROUTES):
+        self.app = app
+        self.store = store
+        self.routes = routes
+
+    def _key(self, scope) -> Optional[bytes]:
+        if not any(scope["method"] == method and pattern.fullmatch(scope["path"]) for method, pattern in self.routes):
+            return None
+        for name, value in scope["headers"]:
+            if name == HEADER:
+                return value
+        return None
+
+    async def __call__(self, scope, receive, send):
+        key = self._key(scope) if scope["type"] == "http" else None
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await self.error(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+        key = key.decode("latin-1")
+        body = await read_body(receive)
+        request = fingerprint(scope["method"], scope["path"], body)
+
+        conflict = False
+        while True:
+            stored = self.store.get(key)
+            if stored is not None:
+                conflict = stored.fingerprint != request
+                break
+            running = self.store.in_flight.get(key)
+            if running is None:
+                break
+            if running[0] != request:
+                conflict = True
+                break
+            # Wait for the first attempt; if it stored nothing, this one runs instead
+            IDEMPOTENCY.inc("waited")
+            await running[1].wait()
+        if conflict:
+            IDEMPOTENCY.inc("conflict")
+            await self.error(send, 422, "Idempotency-Key was already used for a different request")
+            return
+        if stored is not None:
+            IDEMPOTENCY.inc("replayed")
+            await self.replay(send, stored)
+            return
+
+        self.store.begin(key, request)
+        response = None
+        try:
+            response = await self.call(scope, body, receive, send, request)
+        finally:
+            self.store.finish(key, response)
+        if response is not None:
+            IDEMPOTENCY.inc("stored")
+
+    async def call(self, scope, body: bytes, receive, send, request: bytes) -> Optional[StoredResponse]:
+        """Run the request, passing the response through while keeping a copy."""
+        status_code = 500
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks = []
+        replayed_body = False
+
+        async def receive_body():
+            nonlocal replayed_body
+            if replayed_body:
+                # The body was read already; what is left is the disconnect
+                return await receive()
+            replayed_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send_and_keep(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [(name, value) for name, value in message.get("headers", []) if name not in _NOT_STORED]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive_body, send_and_keep)
+        if 300 <= status_code < 400 or status_code >= 500:
+            return None
+        return StoredResponse(request, status_code, headers, b"".join(chunks))
+
+    async def replay(self, send, stored: StoredResponse) -> None:
+        headers = stored.headers + [
+            (b"content-length", str(len(stored.body)).encode()),
+            (b"idempotent-replayed", b"true"),
+        ]
+        await send({"type": "http.response.start", "status": stored.status, "headers": headers})
+        await send({"type": "http.response.body", "body": stored.body})
+
+    async def error(self, send, status_code: int, detail: str) -> None:
+        body = orjson.dumps({"detail": detail})
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
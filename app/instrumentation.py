@@ -0,0 +1,118 @@
+# Per-request SQL statistics: statement count and time spent in the database
+import logging
+import time
+import warnings
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("app.sql")
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    db_time: float = 0.0
+
+
+class QueryBudgetWarning(UserWarning):
+    """A request ran more SQL statements than the configured budget."""
+
+
+# Set by QueryStatsMiddleware for the duration of a request. SQLAlchemy's
+# async greenlets share the calling task's context, so the engine hooks
+# below see the request's stats object.
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None and conn.info.get("query_start"):
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - conn.info["query_start"].pop()
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware reporting each request's SQL statements and DB time.
+
+    Adds ``Server-Timing: db;dur=<ms>;desc="<n> queries", app;dur=<ms>`` to
+    the response and logs one line per request to the ``app.sql`` logger.
+    With a ``budget`` above zero, a request running more statements than
+    that emits a QueryBudgetWarning (run tests with
+    ``-W error::app.instrumentation.QueryBudgetWarning`` to fail on it).
+    Statements run while a streaming body is sent are logged but can't be
+    in the header.
+    """
+
+    def __init__(self, app, budget: int = 0):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats, time.perf_counter() - start).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self.report(scope, status_code, stats, time.perf_counter() - start)
+
+    def report(self, scope, status_code: int, stats: QueryStats, elapsed: float) -> None:
+        route = scope.get("route")
+        path = getattr(route, "path", scope["path"])
+        fields = {
+            "method": scope["method"],
+            "path": path,
+            "status": status_code,
+            "queries": stats.queries,
+            "db_ms": round(stats.db_time * 1000, 2),
+            "total_ms": round(elapsed * 1000, 2),
+        }
+        logger.info("%(method)s %(path)s status=%(status)s queries=%(queries)s db_ms=%(db_ms)s "
+                    "total_ms=%(total_ms)s", fields, extra={"sql": fields})
+        if self.budget and stats.queries > self.budget:
+            message = f"{fields['method']} {path} ran {stats.queries} SQL statements (budget {self.budget})"
+            logger.warning(message, extra={"sql": fields})
+            warnings.warn(message, QueryBudgetWarning, stacklevel=2)
+
+
+def server_timing(stats: QueryStats, elapsed: float) -> str:
+    return (f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+            f"app;dur={elapsed * 1000:.2f}")
@@ -0,0 +1,146 @@
+# Asynchronous registration intake: queue requests, register them in batches
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app import crud
+from app.cache import TTLCache
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.live import broadcaster
+from app.metrics import REGISTRATIONS
+from app.schemas import RegistrationCreate, RegistrationTicket
+
+logger = logging.getLogger("app.intake")
+
+# (event_id, registrations with unique emails) -> bulk_register_attendees outcome
+BatchWriter = Callable[[int, Sequence[RegistrationCreate]], Awaitable[Optional[Dict[str, Tuple[str, Optional[int], Optional[int]]]]]]
+
+DETAILS = {
+    "duplicate": "Attendee already registered for this event.",
+    "full": "Event is fully booked.",
+    "not_found": "Event not found",
+}
+
+
+class IntakeFull(Exception):
+    """The intake queue is at capacity; the client should retry later."""
+
+
+async def write_batch(event_id: int, regs: Sequence[RegistrationCreate]):
+    async with AsyncSessionLocal() as db:
+        return await crud.bulk_register_attendees(db, event_id, regs)
+
+
+class RegistrationIntake:
+    """Bounded queue of registrations drained by a single batch writer.
+
+    ``submit`` returns a pending ticket immediately. The writer takes up to
+    ``batch_size`` queued requests at a time and registers each event's share
+    in one transaction with crud.bulk_register_attendees, which locks the
+    event row and hands out seats in queue (arrival) order. Tickets live in
+    this worker's memory for ``ticket_ttl`` seconds, so clients must poll the
+    worker that accepted the request.
+    """
+
+    def __init__(self, queue_size: int = 10_000, batch_size: int = 500, ticket_ttl: float = 600.0,
+                 writer: BatchWriter = write_batch):
+        self.batch_size = batch_size
+        self.writer = writer
+        self.tickets = TTLCache(maxsize=queue_size * 10, ttl=ticket_ttl)
+        self._queue: "asyncio.Queue[Tuple[RegistrationTicket, RegistrationCreate]]" = asyncio.Queue(queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, event_id: int, reg: RegistrationCreate) -> RegistrationTicket:
+        ticket = RegistrationTicket(ticket=uuid.uuid4().hex, event_id=event_id, email=reg.email, status="pending")
+        try:
+            self._queue.put_nowait((ticket, reg))
+        except asyncio.QueueFull:
+            raise IntakeFull()
+        self.tickets.set(ticket.ticket, ticket)
+        return ticket
+
+    def get(self, ticket: str) -> Optional[RegistrationTicket]:
+        return self.tickets.get(ticket, None)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Finish what is queued (up to ``timeout`` seconds), then stop the writer."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("stopping intake with %d registrations still queued", self._queue.qsize())
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self.process(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def process(self, batch: List[Tuple[RegistrationTicket, RegistrationCreate]]) -> None:
+        by_event: Dict[int, List[Tuple[RegistrationTicket, RegistrationCreate]]] = {}
+        for ticket, reg in batch:
+            by_event.setdefault(ticket.event_id, []).append((ticket, reg))
+        for event_id, items in by_event.items():
+            await self._process_event(event_id, items)
+
+    async def _process_event(self, event_id: int, items: List[Tuple[RegistrationTicket, RegistrationCreate]]) -> None:
+        unique: Dict[str, RegistrationCreate] = {}
+        for ticket, reg in items:
+            unique.setdefault(reg.email, reg)
+        try:
+            outcome = await self.writer(event_id, list(unique.values()))
+        except Exception:
+            # Keep the writer alive; these requests can be retried
+            logger.exception("intake batch for event %s failed", event_id)
+            for ticket, _ in items:
+                self._finish(ticket, "failed", detail="Registration could not be processed, please retry.")
+            return
+        if outcome is not None:
+            broadcaster.changed(event_id)
+        seen = set()
+        for ticket, reg in items:
+            if outcome is None:
+                self._finish(ticket, "not_found")
+            elif reg.email in seen:
+                # A repeat of a request earlier in the same batch
+                self._finish(ticket, "duplicate")
+            else:
+                seen.add(reg.email)
+                row_status, registration_id, attendee_id = outcome[reg.email]
+                self._finish(ticket, row_status, registration_id, attendee_id)
+
+    def _finish(self, ticket: RegistrationTicket, status: str, registration_id: Optional[int] = None,
+                attendee_id: Optional[int] = None, detail: Optional[str] = None) -> None:
+        ticket.status = status
+        ticket.registration_id = registration_id
+        ticket.attendee_id = attendee_id
+        ticket.detail = detail or DETAILS.get(status)
+        if status in ("created", "duplicate", "full"):
+            REGISTRATIONS.inc("accepted" if status == "created" else status)
+        # Keep finished tickets around for a full TTL from now
+        self.tickets.set(ticket.ticket, ticket)
+
+
+intake = RegistrationIntake(
+    queue_size=get_settings().intake_queue_size,
+    batch_size=get_settings().intake_batch_size,
+    ticket_ttl=get_settings().intake_ticket_ttl,
+)
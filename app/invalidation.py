@@ -0,0 +1,136 @@
+# Cross-worker cache invalidation over Postgres LISTEN/NOTIFY
+import asyncio
+import logging
+import uuid
+from typing import Callable, Optional, Union
+
+import asyncpg
+from sqlalchemy import ColumnElement, String, cast, func, literal
+from sqlalchemy.engine import make_url
+
+from app.cache import evict_event, flush_events
+from app.config import get_settings
+from app.metrics import CACHE_INVALIDATIONS
+
+logger = logging.getLogger("app.invalidation")
+
+# Tags this process's notifications so its listener can skip them: the
+# writer has already updated its own caches
+WORKER_ID = uuid.uuid4().hex[:8]
+
+
+def publish(event_id: Union[int, ColumnElement], channel: Optional[str] = None):
+    """SQL expression that NOTIFYs the other workers that an event changed.
+
+    Select it inside the writing transaction: Postgres only delivers the
+    notification if the transaction commits, and merges duplicates. The
+    payload is "<worker>:<event id>"; ``event_id`` may be a column, to
+    publish one notification per row.
+    """
+    channel = channel or get_settings().invalidation_channel
+    if isinstance(event_id, int):
+        return func.pg_notify(channel, f"{WORKER_ID}:{event_id}")
+    return func.pg_notify(channel, literal(f"{WORKER_ID}:") + cast(event_id, String))
+
+
+def listen_dsn(url: str) -> str:
+    """asyncpg DSN for a SQLAlchemy database URL."""
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class InvalidationListener:
+    """Keeps one LISTEN connection and evicts events other workers changed.
+
+    Postgres does not replay notifications, so after every disconnect the
+    listener flushes the caches twice: at once (nothing will be heard until
+    it reconnects) and again once listening resumes (writes in between were
+    never heard). A connection that goes quiet is probed every
+    ``keepalive`` seconds so a dead network is noticed too.
+    """
+
+    def __init__(self, dsn: str, channel: Optional[str] = None, keepalive: float = 10.0,
+                 reconnect_delay: float = 0.5, max_reconnect_delay: float = 30.0,
+                 evict: Callable[[int], None] = evict_event, flush: Callable[[], None] = flush_events):
+        self.dsn = dsn
+        self.channel = channel or get_settings().invalidation_channel
+        self.keepalive = keepalive
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.evict = evict
+        self.flush = flush
+        self.connections = 0
+        self.pid: Optional[int] = None
+        self.listening = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def handle(self, payload: str) -> None:
+        worker, _, event_id = payload.partition(":")
+        if worker == WORKER_ID:
+            return
+        try:
+            event_id = int(event_id)
+        except ValueError:
+            logger.warning("unexpected invalidation %r, flushing caches", payload)
+            self._flush()
+            return
+        CACHE_INVALIDATIONS.inc("event")
+        self.evict(event_id)
+
+    def _flush(self) -> None:
+        CACHE_INVALIDATIONS.inc("flush")
+        self.flush()
+
+    def _on_notification(self, conn, pid, channel, payload) -> None:
+        self.handle(payload)
+
+    async def run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            try:
+                conn = await asyncpg.connect(self.dsn, timeout=self.keepalive,
+                                             server_settings={"application_name": "invalidation-listener"})
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning("invalidation listener cannot connect (%s), retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+            delay = self.reconnect_delay
+            try:
+                await self._listen(conn)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning("invalidation listener lost its connection (%s), reconnecting", e)
+            finally:
+                self.listening.clear()
+                conn.terminate()
+            self._flush()
+
+    async def _listen(self, conn: asyncpg.Connection) -> None:
+        lost = asyncio.Event()
+        conn.add_termination_listener(lambda _: lost.set())
+        await conn.add_listener(self.channel, self._on_notification)
+        self.connections += 1
+        self.pid = conn.get_server_pid()
+        if self.connections > 1:
+            self._flush()
+        self.listening.set()
+        while not lost.is_set():
+            try:
+                await asyncio.wait_for(lost.wait(), self.keepalive)
+            except asyncio.TimeoutError:
+                await asyncio.wait_for(conn.execute("SELECT 1"), self.keepalive)
+        raise asyncpg.InterfaceError("connection closed")
+
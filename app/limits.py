@@ -0,0 +1,140 @@
+# Adaptive concurrency limits per route class, shedding excess load with 503
+import math
+import re
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import orjson
+
+from app.metrics import CONCURRENCY_LIMIT, LOAD_SHED
+
+# (method, path pattern, route class); paths that match nothing are not limited.
+# Exports and live streams are left out: they are long by design and would
+# read as overload.
+ROUTE_CLASSES: Tuple[Tuple[str, "re.Pattern", str], ...] = (
+    ("POST", re.compile(r"/events/\d+/register(/bulk)?"), "registration"),
+    ("DELETE", re.compile(r"/events/\d+/attendees/\d+"), "registration"),
+    ("GET", re.compile(r"/events/?"), "listing"),
+    ("GET", re.compile(r"/events/batch"), "listing"),
+    ("GET", re.compile(r"/events/\d+/attendees"), "listing"),
+)
+
+
+def route_class(method: str, path: str,
+                classes: Sequence[Tuple[str, "re.Pattern", str]] = ROUTE_CLASSES) -> Optional[str]:
+    for class_method, pattern, name in classes:
+        if method == class_method and pattern.fullmatch(path):
+            return name
+    return None
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit driven by request latency.
+
+    Every completed request is a sample. One slower than ``latency_target``
+    (or failed) cuts the limit by ``backoff``, at most once per
+    ``latency_target`` so a burst of slow completions counts as one signal;
+    fast ones while the limit is in use grow it by about one per ``limit``
+    completions. The limit stays between ``min_limit`` and ``max_limit``.
+    """
+
+    def __init__(self, name: str, initial: int = 20, min_limit: int = 2, max_limit: int = 200,
+                 latency_target: float = 0.1, backoff: float = 0.9,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.clock = clock
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self._last_decrease = -math.inf
+        CONCURRENCY_LIMIT.set(int(self.limit), name)
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float, failed: bool = False) -> None:
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        if failed or latency > self.latency_target:
+            now = self.clock()
+            if now - self._last_decrease >= self.latency_target:
+                self._last_decrease = now
+                self.limit = max(self.limit * self.backoff, self.min_limit)
+        elif in_flight * 2 >= self.limit:
+            # Only grow when the limit is what holds requests back
+            self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+        CONCURRENCY_LIMIT.set(int(self.limit), self.name)
+
+
+def limits_from_settings(config) -> Dict[str, AdaptiveLimit]:
+    return {
+        "registration": AdaptiveLimit("registration", config.concurrency_registration_limit,
+                                      config.concurrency_min_limit, config.concurrency_max_limit,
+                                      config.concurrency_registration_latency_target),
+        "listing": AdaptiveLimit("listing", config.concurrency_listing_limit,
+                                 config.concurrency_min_limit, config.concurrency_max_limit,
+                                 config.concurrency_listing_latency_target),
+    }
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware enforcing an AdaptiveLimit per route class.
+
+    A request over its class's limit gets an immediate ``503`` with
+    ``Retry-After`` instead of waiting: under overload the admitted requests
+    keep their latency, and clients back off rather than piling onto the
+    database pool. Responses of 500 and above count as failed samples.
+    """
+
+    def __init__(self, app, limits: Dict[str, AdaptiveLimit], retry_after: int = 1,
+                 classes: Sequence[Tuple[str, "re.Pattern", str]] = ROUTE_CLASSES):
+        self.app = app
+        self.limits = limits
+        self.retry_after = retry_after
+        self.classes = classes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"], self.classes)
+        limit = self.limits.get(name) if name is not None else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        if not limit.try_acquire():
+            LOAD_SHED.inc(name)
+            await self.reject(send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            limit.release(time.perf_counter() - start, failed=status_code >= 500)
+
+    async def reject(self, send) -> None:
+        body = orjson.dumps({"detail": "Server is busy, please retry later"})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,108 @@
+# Live seat availability pushed to subscribers (GET /events/{event_id}/live)
+import asyncio
+import contextvars
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app import crud
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.metrics import LIVE_MESSAGES, LIVE_SUBSCRIBERS
+
+logger = logging.getLogger("app.live")
+
+
+async def load_seats(event_id: int) -> Optional[dict]:
+    """Current availability of an event from the primary, or None if it no longer exists."""
+    async with AsyncSessionLocal() as db:
+        current = await crud.get_event_version(db, event_id)
+    if current is None:
+        return None
+    return {
+        "event_id": event_id,
+        "registered": current.registered_count,
+        "seats_remaining": max(current.max_capacity - current.registered_count, 0),
+        "version": current.version,
+    }
+
+
+class Subscription:
+    """One client's view of an event: only the latest state is kept, so slow clients skip states."""
+
+    def __init__(self, event_id: int):
+        self.event_id = event_id
+        self._latest: Optional[dict] = None
+        self._ready = asyncio.Event()
+
+    def put(self, state: Optional[dict]) -> None:
+        # Loads can finish out of order; never go back to an older version
+        if state is not None and self._latest is not None and state["version"] < self._latest["version"]:
+            return
+        self._latest = state
+        self._ready.set()
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Wait for the next state (None once the event is gone); asyncio.TimeoutError after ``timeout`` seconds."""
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        self._ready.clear()
+        return self._latest
+
+
+class Broadcaster:
+    """Fans event availability out to this worker's subscribers.
+
+    ``changed`` is cheap and may be called for every registration: the first
+    call for a watched event schedules one load after ``interval`` seconds and
+    later calls in that window are merged into it, so a burst of writes costs
+    one query and one message per window however many subscribers there are.
+    """
+
+    def __init__(self, interval: float = 0.5, load: Callable[[int], Awaitable[Optional[dict]]] = load_seats):
+        self.interval = interval
+        self.load = load
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._pending: Dict[int, asyncio.Task] = {}
+
+    def subscribe(self, event_id: int) -> Subscription:
+        subscription = Subscription(event_id)
+        self._subscribers.setdefault(event_id, set()).add(subscription)
+        LIVE_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.event_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        LIVE_SUBSCRIBERS.dec()
+        if not subscribers:
+            del self._subscribers[subscription.event_id]
+
+    def changed(self, event_id: int) -> None:
+        if event_id not in self._subscribers or event_id in self._pending:
+            return
+        # A clean context keeps the load out of the current request's query stats
+        self._pending[event_id] = contextvars.Context().run(asyncio.create_task, self._flush(event_id))
+
+    def changed_all(self) -> None:
+        for event_id in list(self._subscribers):
+            self.changed(event_id)
+
+    async def _flush(self, event_id: int) -> None:
+        try:
+            await asyncio.sleep(self.interval)
+        finally:
+            # Changes from here on schedule the next flush
+            del self._pending[event_id]
+        try:
+            state = await self.load(event_id)
+        except Exception:
+            logger.exception("could not load live state of event %s", event_id)
+            return
+        subscribers = self._subscribers.get(event_id, ())
+        for subscription in subscribers:
+            subscription.put(state)
+        LIVE_MESSAGES.inc(amount=len(subscribers))
+
+
+broadcaster = Broadcaster(interval=get_settings().live_interval)
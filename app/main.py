@@ -1,9 +1,71 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.routes import events, attendees
+from sqlalchemy import exc
+
+from app import crud, database
+from app.cache import evict_event, flush_events
+from app.config import get_settings
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.intake import intake
+from app.invalidation import InvalidationListener, listen_dsn
+from app.limits import ConcurrencyLimitMiddleware, limits_from_settings
+from app.live import broadcaster
+from app.instrumentation import QueryStatsMiddleware
+from app.metrics import MetricsMiddleware
+from app.routes import events, attendees, internal, metrics
+
+logger = logging.getLogger("app")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # An engine set up beforehand (e.g. by tests via database.init_engines) is kept
+    engine = database.get_engine()
+    warm = min(settings.db_warmup_connections, settings.db_pool_size)
+    try:
+        await database.warm_up(engine, warm, crud.prepare_statements)
+    except (OSError, exc.DBAPIError) as e:
+        # Still start: connections are made on demand and /internal/ready reports the outage
+        logger.warning("database warm-up failed: %s", e)
+    listener = None
+    if settings.invalidation_listen:
+        def evict(event_id: int) -> None:
+            evict_event(event_id)
+            broadcaster.changed(event_id)
+
+        def flush() -> None:
+            flush_events()
+            broadcaster.changed_all()
+
+        listener = InvalidationListener(listen_dsn(settings.database_url), keepalive=settings.invalidation_keepalive,
+                                        evict=evict, flush=flush)
+        listener.start()
+    if settings.registration_intake:
+        intake.start()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    await intake.stop()
+    if listener is not None:
+        await listener.stop()
+    await database.dispose_engines()
 
-app = FastAPI(title="Mini Event Management System")
+settings = get_settings()
+app = FastAPI(title="Mini Event Management System", lifespan=lifespan)
+app.add_middleware(QueryStatsMiddleware, budget=settings.sql_query_budget)
+if settings.concurrency_limits:
+    # Inside MetricsMiddleware, so shed requests are recorded as 503s under their route
+    app.add_middleware(ConcurrencyLimitMiddleware, limits=limits_from_settings(settings),
+                       retry_after=settings.concurrency_retry_after)
+# Outside the limits: replays cost nothing, so they are never shed
+app.add_middleware(IdempotencyMiddleware,
+                   store=IdempotencyStore(settings.idempotency_cache_size, settings.idempotency_ttl))
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(events.router)
 app.include_router(attendees.router)
+app.include_router(internal.router)
+app.include_router(metrics.router)
 
 # Routers will be included here 
\ No newline at end of file
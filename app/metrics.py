@@ -0,0 +1,184 @@
+# Prometheus metrics kept in-process and rendered in the text exposition format
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from starlette.routing import Match
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; tuned for an API whose requests mostly take a few milliseconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base class: a named metric with a fixed set of label names.
+
+    Updates are plain dict operations with no locking. Each worker process
+    has its own registry and all updates happen on its event loop thread,
+    so nothing can interleave with them; Prometheus sums across workers.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels: str) -> None:
+        """Mirror a count maintained elsewhere (e.g. by the connection pool)."""
+        self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+                for labels, value in self._values.items()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (the last one is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "Request latency by route template",
+                             ["method", "route", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served")
+REGISTRATIONS = Counter("registrations_total", "Registration attempts by outcome", ["result"])
+EVENTS_CREATED = Counter("events_created_total", "Events created")
+DB_POOL = Gauge("db_pool_connections", "Connections in the worker's database pools", ["engine", "state"])
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connection checkouts", ["engine"])
+DB_POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Checkouts that timed out waiting for a connection",
+                           ["engine"])
+LIVE_SUBSCRIBERS = Gauge("live_subscribers", "Open GET /events/{event_id}/live streams")
+LIVE_MESSAGES = Counter("live_messages_total", "Seat updates handed to live subscribers")
+CONCURRENCY_LIMIT = Gauge("concurrency_limit", "Current adaptive concurrency limit by route class", ["route_class"])
+LOAD_SHED = Counter("load_shed_total", "Requests answered 503 for being over their route class's limit",
+                    ["route_class"])
+IDEMPOTENCY = Counter("idempotency_requests_total",
+                      "Requests with an Idempotency-Key: stored, replayed, waited (on an in-flight duplicate), "
+                      "conflict", ["result"])
+CACHE_HITS = Counter("cache_hits_total", "Lookups answered from the worker's in-memory caches", ["cache"])
+CACHE_MISSES = Counter("cache_misses_total", "Lookups the worker's in-memory caches could not answer", ["cache"])
+CACHE_ENTRIES = Gauge("cache_entries", "Entries held in the worker's in-memory caches", ["cache"])
+CACHE_INVALIDATIONS = Counter("cache_invalidations_total",
+                              "Invalidations received from other workers (event) and full cache flushes (flush)",
+                              ["kind"])
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template and requests in flight.
+
+    The route template (``/events/{event_id}/register``) comes from the route
+    Starlette matched, so ids in paths don't multiply the series. Requests
+    answered before routing (shed with a 503, or replayed from an
+    Idempotency-Key) are matched against the app's routes here instead;
+    those that match no route are recorded under "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            REQUEST_DURATION.observe(time.perf_counter() - start, scope["method"],
+                                     route_template(scope), str(status_code))
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    app = scope.get("app")
+    for candidate in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return candidate.path
+    return "unmatched"
@@ -1,32 +1,95 @@
 # SQLAlchemy models will be defined here 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, Computed, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index, func, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship, declarative_base
 import datetime
 
 Base = declarative_base()
 
+# Text search configuration for event search: no stemming or stop words
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
 class Event(Base):
     __tablename__ = 'events'
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     location = Column(String, nullable=False)
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=False)
     max_capacity = Column(Integer, nullable=False)
+    # Maintained by crud.register_attendee / crud.cancel_registration so seat
+    # availability never needs a COUNT over registrations
+    registered_count = Column(Integer, nullable=False, default=0, server_default='0')
+    # Bumped with registered_count and on any other change to the event, so
+    # listings can derive ETags without loading rows (see crud.get_event_versions)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Words of name and location for GET /events?q=, kept by Postgres. Stored
+    # rather than an expression index so filtering a row doesn't re-parse it.
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "to_tsvector('simple'::regconfig, name) || to_tsvector('simple'::regconfig, location)", persisted=True
+    )))
+    __table_args__ = (
+        # Serves the upcoming-events listing: range filter and ORDER BY start_time, id
+        Index('ix_events_start_time_id', 'start_time', 'id'),
+        Index('ix_events_name_id', 'name', 'id'),
+        Index('ix_events_lower_location', func.lower(location)),
+        Index('ix_events_search', 'search_vector', postgresql_using='gin'),
+    )
     attendees = relationship('Registration', back_populates='event', cascade="all, delete-orphan")
 
+    @property
+    def seats_remaining(self) -> int:
+        return max(self.max_capacity - self.registered_count, 0)
+
 class Attendee(Base):
     __tablename__ = 'attendees'
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     email = Column(String, nullable=False, unique=True, index=True)
     registrations = relationship('Registration', back_populates='attendee', cascade="all, delete-orphan")
 
 class Registration(Base):
     __tablename__ = 'registrations'
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     event_id = Column(Integer, ForeignKey('events.id', ondelete='CASCADE'))
     attendee_id = Column(Integer, ForeignKey('attendees.id', ondelete='CASCADE'))
-    __table_args__ = (UniqueConstraint('event_id', 'attendee_id', name='_event_attendee_uc'),)
+    __table_args__ = (
+        UniqueConstraint('event_id', 'attendee_id', name='_event_attendee_uc'),
+        # Keyset pagination of an event's attendees: WHERE event_id = ? AND id > ? ORDER BY id.
+        # attendee_id rides along so the page is read from the index alone.
+        Index('ix_registrations_event_id_id', 'event_id', 'id', postgresql_include=['attendee_id']),
+        Index('ix_registrations_attendee_id', 'attendee_id'),
+    )
     event = relationship('Event', back_populates='attendees')
-    attendee = relationship('Attendee', back_populates='registrations') 
\ No newline at end of file
+    attendee = relationship('Attendee', back_populates='registrations') 
+
+# Events that ended long ago, moved here with their registrations by
+# crud.archive_events (see app/archive.py) to keep the hot tables small. Ids
+# are kept, so an event id is unique across both tables.
+class ArchivedEvent(Base):
+    __tablename__ = 'archived_events'
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String, nullable=False)
+    location = Column(String, nullable=False)
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
+    max_capacity = Column(Integer, nullable=False)
+    registered_count = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    @property
+    def seats_remaining(self) -> int:
+        return max(self.max_capacity - self.registered_count, 0)
+
+class ArchivedRegistration(Base):
+    __tablename__ = 'archived_registrations'
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    event_id = Column(Integer, ForeignKey('archived_events.id', ondelete='CASCADE'), nullable=False)
+    attendee_id = Column(Integer, ForeignKey('attendees.id', ondelete='CASCADE'), nullable=False)
+    __table_args__ = (
+        Index('ix_archived_registrations_event_id_id', 'event_id', 'id', postgresql_include=['attendee_id']),
+        Index('ix_archived_registrations_attendee_id', 'attendee_id'),
+    )
@@ -0,0 +1,65 @@
+# Response classes shared by the routers
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-backed JSON response that renders UTC datetimes with a Z suffix like pydantic does.
+
+    Returning one from a route skips FastAPI's response_model validation, so
+    only use it for content built from trusted data.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+class Conditional(NamedTuple):
+    """A listing's validators, with its content unless the client's copy is current (then None)."""
+    etag: str
+    last_modified: Optional[datetime]
+    content: Any
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        # no-cache: caches may keep the response but must revalidate it each time
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified.astimezone(timezone.utc), usegmt=True)
+        return headers
+
+
+def make_etag(*parts: Any) -> str:
+    return 'W/"' + hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    bare = etag[2:]
+    return "*" in candidates or any(tag.removeprefix("W/") == bare for tag in candidates)
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        # Not an HTTP date (those are always GMT, e.g. "-0000" parses naive): ignore it
+        return False
+    # HTTP dates have whole seconds
+    return last_modified.replace(microsecond=0) <= since
+
+
+def not_modified(result: Conditional) -> Response:
+    return Response(status_code=304, headers=result.headers)
@@ -1,20 +1,78 @@
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import APIRouter, Depends, Header, Request, Response, status, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
-from app.schemas import RegistrationCreate, RegistrationOut, PaginatedAttendees
-from app.services import register_attendee_service, get_attendees_service
+from typing import Optional
+from app.config import get_settings
+from app.database import get_db, get_read_db
+from app.responses import FastJSONResponse, not_modified
+from app.schemas import RegistrationCreate, RegistrationOut, PaginatedAttendees, BulkRegistrationResult, RegistrationTicket
+from app.services import (register_attendee_service, get_attendees_service, cancel_registration_service,
+                          parse_bulk_registrations, bulk_register_service, export_attendees_service, EXPORT_MEDIA_TYPES,
+                          submit_registration_service, get_registration_ticket_service)
 
 router = APIRouter(tags=["Attendees"])
 
-@router.post("/events/{event_id}/register", response_model=RegistrationOut, status_code=status.HTTP_201_CREATED)
+@router.post("/events/{event_id}/register", response_model=RegistrationOut, status_code=status.HTTP_201_CREATED,
+             responses={202: {"model": RegistrationTicket, "description": "Queued (registration intake mode)"}})
 async def register_attendee(event_id: int, reg: RegistrationCreate, db: AsyncSession = Depends(get_db)):
+    if get_settings().registration_intake:
+        ticket = submit_registration_service(event_id, reg)
+        return JSONResponse(ticket.model_dump(), status_code=status.HTTP_202_ACCEPTED,
+                            headers={"Location": f"/registrations/{ticket.ticket}"})
     return await register_attendee_service(db, event_id, reg)
 
-@router.get("/events/{event_id}/attendees", response_model=PaginatedAttendees)
+@router.get("/registrations/{ticket}", response_model=RegistrationTicket)
+async def get_registration_ticket(ticket: str):
+    """Outcome of a registration queued in intake mode: pending until the writer has processed it."""
+    return get_registration_ticket_service(ticket)
+
+@router.post("/events/{event_id}/register/bulk", response_model=BulkRegistrationResult)
+async def bulk_register_attendees(event_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    """Register a JSON array or NDJSON stream of {name, email} objects, reporting a status per row."""
+    rows = parse_bulk_registrations(await request.body(), request.headers.get("content-type", ""))
+    return await bulk_register_service(db, event_id, rows)
+
+@router.delete("/events/{event_id}/attendees/{attendee_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_registration(event_id: int, attendee_id: int, db: AsyncSession = Depends(get_db)):
+    await cancel_registration_service(db, event_id, attendee_id)
+
+@router.get("/events/{event_id}/attendees", response_model=PaginatedAttendees,
+            responses={304: {"description": "No registrations or cancellations since the given ETag or date"}})
 async def list_attendees(
     event_id: int,
+    response: Response,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    after: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor; takes precedence over page"),
+    include_total: Optional[bool] = Query(None, description="Count all attendees (default: only without a cursor)"),
+    include_archived: bool = Query(False, description="Also look for the event among archived (long past) events"),
+    fields: Optional[str] = Query(None, description="Comma-separated attendee fields to return: id, name, email (default: all)"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    result = await get_attendees_service(db, event_id, page, size, after, include_total,
+                                         if_none_match, if_modified_since, include_archived, fields)
+    if result.content is None:
+        return not_modified(result)
+    if fields is not None:
+        # Partial attendees don't fit the response model
+        return FastJSONResponse(result.content, headers=result.headers)
+    response.headers.update(result.headers)
+    return result.content
+
+
+@router.get("/events/{event_id}/attendees/export")
+async def export_attendees(
+    event_id: int,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    include_archived: bool = Query(False, description="Also look for the event among archived (long past) events"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    return await get_attendees_service(db, event_id, page, size)
+    """Stream every attendee of the event as CSV or NDJSON."""
+    chunks = await export_attendees_service(db, event_id, format, include_archived)
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="event-{event_id}-attendees.{format}"'}
+    )
\ No newline at end of file
@@ -1,41 +1,80 @@
-from fastapi import APIRouter, Depends, status, Query, HTTPException
+from fastapi import APIRouter, Depends, Header, status, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
-from app.schemas import EventCreate, EventOut, PaginatedEvents
-from app.services import create_event_service, list_events_service
+from app.database import get_db, get_read_db
+from app.schemas import EventBatch, EventCreate, EventOut, PaginatedEvents
+from app.responses import FastJSONResponse, not_modified
+from app.config import get_settings
+from app.services import (create_event_service, list_events_service, live_seats_service, get_timezone,
+                          get_events_batch_service, MAX_BATCH_IDS)
 from typing import List, Optional
+from datetime import datetime
 import pytz
 
 router = APIRouter(prefix="/events", tags=["Events"])
 
+FIELDS_DESCRIPTION = ("Comma-separated event fields to return, e.g. id,name,start_time "
+                      "(default: all); only the columns they need are read")
+
 @router.post("/", response_model=EventOut, status_code=status.HTTP_201_CREATED)
 async def create_event(event: EventCreate, db: AsyncSession = Depends(get_db)):
     return await create_event_service(db, event)
 
-@router.get("/", response_model=PaginatedEvents)
+@router.get("/", response_model=PaginatedEvents, response_class=FastJSONResponse,
+            responses={304: {"description": "Not modified since the listing with the given ETag"}})
 async def list_events(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
-    timezone: str = Query('Asia/Kolkata', description="Timezone to display event times in")
+    timezone: str = Query('Asia/Kolkata', description="Timezone to display event times in"),
+    available_only: bool = Query(False, description="Only list events with seats remaining"),
+    q: Optional[str] = Query(None, max_length=200, description="Search words in the name and location (prefix match)"),
+    location: Optional[str] = Query(None, description="Only events at this location (case-insensitive)"),
+    starts_after: Optional[datetime] = Query(None, alias="from", description="Earliest start time; naive times are in `timezone`"),
+    starts_before: Optional[datetime] = Query(None, alias="to", description="Latest start time; naive times are in `timezone`"),
+    sort: str = Query("start_time", pattern="^-?(start_time|name)$", description="start_time or name, prefix - to reverse"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include_total: bool = Query(False, description="Count all matching upcoming events (default: total is null)"),
+    if_none_match: Optional[str] = Header(None)
 ):
     try:
         # Validate timezone
-        pytz.timezone(timezone)
+        get_timezone(timezone)
     except pytz.exceptions.UnknownTimeZoneError:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=f"Invalid timezone: {timezone}"
         )
-    
-    events = await list_events_service(db, timezone)
-    total = len(events)
-    start = (page - 1) * size
-    end = start + size
-    events_out = [EventOut.from_orm(e) for e in events[start:end]]
-    return PaginatedEvents(
-        total=total,
-        page=page,
-        size=size,
-        events=events_out
-    )
\ No newline at end of file
+
+    result = await list_events_service(db, timezone, page, size, available_only, q, location,
+                                       starts_after, starts_before, sort, if_none_match, fields, include_total)
+    if result.content is None:
+        return not_modified(result)
+    # Rows come straight from the database, so skip response_model re-validation
+    return FastJSONResponse(result.content, headers=result.headers)
+
+@router.get("/batch", response_model=EventBatch, response_class=FastJSONResponse)
+async def get_events_batch(
+    ids: str = Query(..., description=f"Comma-separated event ids, at most {MAX_BATCH_IDS}"),
+    timezone: str = Query('Asia/Kolkata', description="Timezone to display event times in"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Look up several events at once, in the order given; unknown ids are listed under `missing`."""
+    try:
+        get_timezone(timezone)
+    except pytz.exceptions.UnknownTimeZoneError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid timezone: {timezone}"
+        )
+    return FastJSONResponse(await get_events_batch_service(db, ids, timezone, fields))
+
+@router.get("/{event_id}/live", response_class=StreamingResponse,
+            responses={200: {"content": {"text/event-stream": {}},
+                             "description": "Server-Sent Events: `seats` on every change, `gone` if the event is removed"}})
+async def live_seats(event_id: int):
+    """Push the event's registered count and seats remaining as they change, instead of polling."""
+    events = await live_seats_service(event_id, get_settings().live_keepalive)
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,29 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy import exc, text
+
+from app import database
+from app.database import pool_stats
+
+router = APIRouter(prefix="/internal", tags=["Internal"])
+
+@router.get("/pool")
+async def get_pool_stats():
+    """Live connection pool stats for this worker, for sizing pools from real data."""
+    return {
+        "primary": pool_stats(database.get_engine()),
+        "replicas": [pool_stats(replica) for replica in database.replicas.engines],
+    }
+
+@router.get("/ready")
+async def readiness(request: Request):
+    """200 once startup (engine and pool warm-up) is done and the database answers, 503 otherwise."""
+    if not getattr(request.app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Starting up or shutting down")
+    try:
+        async with database.get_engine().connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=2)
+    except (OSError, asyncio.TimeoutError, exc.DBAPIError, exc.TimeoutError):
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return {"status": "ready"}
@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from app import database, metrics
+from app.cache import event_cache, sold_out_events
+from app.database import pool_stats
+
+router = APIRouter(tags=["Internal"])
+
+def _record_pool(name: str, stats: dict) -> None:
+    metrics.DB_POOL.set(stats["checked_out"], name, "checked_out")
+    metrics.DB_POOL.set(stats["checked_in"], name, "checked_in")
+    metrics.DB_POOL.set(stats["overflow"], name, "overflow")
+    metrics.DB_POOL.set(stats["pool_size"], name, "pool_size")
+    metrics.DB_POOL_CHECKOUTS.set(stats["checkouts"], name)
+    metrics.DB_POOL_TIMEOUTS.set(stats["checkout_timeouts"], name)
+
+def _record_cache(name: str, stats: dict) -> None:
+    metrics.CACHE_HITS.set(stats["hits"], name)
+    metrics.CACHE_MISSES.set(stats["misses"], name)
+    metrics.CACHE_ENTRIES.set(stats["size"], name)
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """This worker's metrics in the Prometheus text format."""
+    _record_pool("primary", pool_stats(database.get_engine()))
+    for index, replica in enumerate(database.replicas.engines):
+        _record_pool(f"replica{index}", pool_stats(replica))
+    _record_cache("event", event_cache.stats())
+    _record_cache("sold_out", sold_out_events.stats())
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,5 +1,4 @@
 # Pydantic schemas will be defined here
-from _testcapi import INT_MAX
 from pydantic import BaseModel, EmailStr, Field, validator
 from typing import List, Optional
 from datetime import datetime
@@ -8,6 +7,9 @@ import pytz
 IST = pytz.timezone('Asia/Kolkata')
 UTC = pytz.UTC
 
+# Largest value of a Postgres integer column
+INT_MAX = 2**31 - 1
+
 class EventBase(BaseModel):
     name: str = Field(..., min_length=1)
     location: str = Field(..., min_length=1)
@@ -40,15 +42,20 @@ class EventCreate(EventBase):
 
 class EventOut(EventBase):
     id: int
+    seats_remaining: int
     class Config:
         from_attributes = True
 
 class PaginatedEvents(BaseModel):
-    total: int
+    total: Optional[int] = None
     page: int
     size: int
     events: List[EventOut]
 
+class EventBatch(BaseModel):
+    events: List[EventOut]
+    missing: List[int]
+
 class AttendeeBase(BaseModel):
     name: str = Field(..., min_length=1)
     email: EmailStr
@@ -73,7 +80,32 @@ class RegistrationOut(BaseModel):
         from_attributes = True
 
 class PaginatedAttendees(BaseModel):
-    total: int
+    total: Optional[int] = None
     page: int
     size: int
-    attendees: List[AttendeeOut] 
\ No newline at end of file
+    next_cursor: Optional[str] = None
+    attendees: List[AttendeeOut] 
+
+class BulkRegistrationRow(BaseModel):
+    index: int
+    email: Optional[str] = None
+    status: str  # created | duplicate | full | invalid
+    registration_id: Optional[int] = None
+    attendee_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BulkRegistrationResult(BaseModel):
+    created: int
+    duplicate: int
+    full: int
+    invalid: int
+    results: List[BulkRegistrationRow]
+
+class RegistrationTicket(BaseModel):
+    ticket: str
+    event_id: int
+    email: str
+    status: str  # pending | created | duplicate | full | not_found | failed
+    registration_id: Optional[int] = None
+    attendee_id: Optional[int] = None
+    detail: Optional[str] = None
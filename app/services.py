@@ -1,13 +1,29 @@
 # Business logic and service functions will be defined here 
 
 from app import crud
-from app.schemas import EventCreate, AttendeeCreate, RegistrationCreate, PaginatedAttendees, AttendeeOut, EventOut
+from app.database import AsyncSessionLocal
+from app.intake import IntakeFull, intake
+from app.live import broadcaster
+from app.metrics import EVENTS_CREATED, REGISTRATIONS
+from app.schemas import (EventCreate, RegistrationCreate, PaginatedAttendees, AttendeeOut,
+                         BulkRegistrationRow, BulkRegistrationResult, RegistrationTicket, INT_MAX)
 from app.models import Event
+from app.responses import Conditional, etag_matches, make_etag, not_modified_since
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
+from collections import Counter
+from pydantic import ValidationError
+import asyncio
+import base64
+import binascii
+import csv
+import io
+import json
 import pytz
-from datetime import datetime
+from datetime import datetime, tzinfo
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 IST = pytz.timezone('Asia/Kolkata')
 UTC = pytz.UTC
@@ -18,56 +34,431 @@ def ensure_utc(dt: datetime) -> datetime:
         return UTC.localize(dt)
     return dt.astimezone(UTC)
 
+@lru_cache(maxsize=1024)
+def get_timezone(name: str) -> tzinfo:
+    """Resolve a timezone name once.
+
+    Names are validated against pytz (raising UnknownTimeZoneError), but the
+    returned tzinfo is zoneinfo's when available: it converts several times
+    faster and orjson serializes it natively.
+    """
+    tz = pytz.timezone(name)
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return tz
+
 def convert_to_timezone(dt: datetime, target_timezone: str) -> datetime:
     """Convert datetime to target timezone."""
     if dt.tzinfo is None:
         dt = UTC.localize(dt)
-    target_tz = pytz.timezone(target_timezone)
-    return dt.astimezone(target_tz)
+    return dt.astimezone(get_timezone(target_timezone))
+
+def serialize_event(event: Event, tz: tzinfo) -> dict:
+    """Build an EventOut-shaped dict from a trusted DB row without running validators."""
+    start_time, end_time = event.start_time, event.end_time
+    if start_time.tzinfo is None:
+        start_time = UTC.localize(start_time)
+    if end_time.tzinfo is None:
+        end_time = UTC.localize(end_time)
+    return {
+        "name": event.name,
+        "location": event.location,
+        "start_time": start_time.astimezone(tz),
+        "end_time": end_time.astimezone(tz),
+        "max_capacity": event.max_capacity,
+        "id": event.id,
+        "seats_remaining": event.seats_remaining,
+    }
+
+def _local_time(dt: datetime, tz: tzinfo) -> datetime:
+    if dt.tzinfo is None:
+        dt = UTC.localize(dt)
+    return dt.astimezone(tz)
+
+# How each field of a sparse event is read from an Event or a narrowed row
+_EVENT_FIELD_VALUES = {
+    "id": lambda event, tz: event.id,
+    "name": lambda event, tz: event.name,
+    "location": lambda event, tz: event.location,
+    "start_time": lambda event, tz: _local_time(event.start_time, tz),
+    "end_time": lambda event, tz: _local_time(event.end_time, tz),
+    "max_capacity": lambda event, tz: event.max_capacity,
+    "seats_remaining": lambda event, tz: max(event.max_capacity - event.registered_count, 0),
+}
+EVENT_FIELDS = tuple(crud.EVENT_FIELD_COLUMNS)
+ATTENDEE_FIELDS = tuple(crud.ATTENDEE_FIELD_COLUMNS)
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[Tuple[str, ...]]:
+    """Split a comma-separated ``fields`` parameter into field names, or None to return every field."""
+    if fields is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise HTTPException(status_code=422,
+                            detail=f"Unknown fields {', '.join(unknown) or '(none given)'}; choose from {', '.join(allowed)}")
+    return names
+
+def serialize_sparse_event(event, tz: tzinfo, fields: Sequence[str]) -> dict:
+    """Like serialize_event, with only ``fields``; works on the narrowed rows of crud.get_events too."""
+    return {field: _EVENT_FIELD_VALUES[field](event, tz) for field in fields}
 
 async def create_event_service(db: AsyncSession, event: EventCreate):
     # Convert times to UTC before storing
     event_dict = event.dict()
     event_dict['start_time'] = ensure_utc(event.start_time)
     event_dict['end_time'] = ensure_utc(event.end_time)
-    return await crud.create_event(db, EventCreate(**event_dict))
-
-async def list_events_service(db: AsyncSession, timezone: Optional[str] = 'Asia/Kolkata'):
-    events = await crud.get_events(db)
-    # Convert times to requested timezone
-    events_out = []
-    for event in events:
-        event_out = EventOut.from_orm(event)
-        # Convert UTC times to target timezone
-        event_out.start_time = convert_to_timezone(event_out.start_time, timezone)
-        event_out.end_time = convert_to_timezone(event_out.end_time, timezone)
-        events_out.append(event_out)
-    return events_out
+    db_event = await crud.create_event(db, EventCreate(**event_dict))
+    EVENTS_CREATED.inc()
+    return db_event
+
+def localize(dt: Optional[datetime], tz: tzinfo) -> Optional[datetime]:
+    """Attach tz to a naive datetime; aware ones are returned unchanged."""
+    if dt is None or dt.tzinfo is not None:
+        return dt
+    return tz.localize(dt) if hasattr(tz, "localize") else dt.replace(tzinfo=tz)
+
+async def list_events_service(db: AsyncSession, timezone: Optional[str] = 'Asia/Kolkata', page: int = 1, size: int = 10,
+                              available_only: bool = False, q: Optional[str] = None, location: Optional[str] = None,
+                              starts_after: Optional[datetime] = None, starts_before: Optional[datetime] = None,
+                              sort: str = "start_time", if_none_match: Optional[str] = None,
+                              fields: Optional[str] = None, include_total: bool = False) -> Conditional:
+    """Return one page of upcoming events as a PaginatedEvents-shaped dict, ready for FastJSONResponse.
+
+    Naive ``starts_after``/``starts_before`` are read in ``timezone``, like the
+    times in the response. ``fields`` (comma-separated) narrows each event to
+    those keys, and the query to the columns they need. The total is only
+    counted with ``include_total``: it aggregates every matching upcoming
+    event, which a page doesn't need. The ETag covers the parameters, the total and the
+    (id, version) of each event on the page; when ``if_none_match`` carries it
+    the content is None and no event rows are loaded.
+    """
+    tz = get_timezone(timezone)
+    filters = {
+        "q": q,
+        "location": location,
+        "starts_after": localize(starts_after, tz),
+        "starts_before": localize(starts_before, tz),
+    }
+    if filters["starts_after"] and filters["starts_before"] and filters["starts_after"] > filters["starts_before"]:
+        raise HTTPException(status_code=422, detail="'from' must not be later than 'to'")
+    if q and crud.search_terms(q) is None:
+        raise HTTPException(status_code=422, detail="'q' must contain at least one word to search for")
+    selected = parse_fields(fields, EVENT_FIELDS)
+    skip = (page - 1) * size
+    params = (timezone, page, size, available_only, sort, sorted(filters.items()), selected, include_total)
+    total = await crud.count_events(db, available_only=available_only, **filters) if include_total else None
+    if if_none_match:
+        versions = await crud.get_event_versions(db, skip=skip, limit=size, available_only=available_only,
+                                                 sort=sort, **filters)
+        etag = make_etag(params, total, [tuple(row) for row in versions])
+        if etag_matches(if_none_match, etag):
+            return Conditional(etag, None, None)
+    events = await crud.get_events(db, skip=skip, limit=size, available_only=available_only, sort=sort,
+                                   fields=selected, **filters)
+    # Computed from the rows actually served, in case they changed since the versions were read
+    etag = make_etag(params, total, [(event.id, event.version) for event in events])
+    return Conditional(etag, None, {
+        "total": total,
+        "page": page,
+        "size": size,
+        "events": [serialize_event(event, tz) if selected is None else serialize_sparse_event(event, tz, selected)
+                   for event in events],
+    })
+
+MAX_BATCH_IDS = 100
+
+def parse_ids(ids: str) -> List[int]:
+    """Comma-separated event ids, deduplicated in order; 422 if malformed, out of range or more than MAX_BATCH_IDS."""
+    try:
+        parsed = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be comma-separated integers")
+    if any(not 1 <= event_id <= INT_MAX for event_id in parsed):
+        raise HTTPException(status_code=422, detail=f"ids must be between 1 and {INT_MAX}")
+    if not parsed or len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"Give between 1 and {MAX_BATCH_IDS} ids")
+    return parsed
+
+async def get_events_batch_service(db: AsyncSession, ids: str, timezone: str = 'Asia/Kolkata',
+                                   fields: Optional[str] = None) -> dict:
+    """Events for a list of ids, read in one query, as an EventBatch-shaped dict.
+
+    Events come back in the order asked for; ids that match no event (or an
+    archived one) are listed under ``missing``.
+    """
+    event_ids = parse_ids(ids)
+    selected = parse_fields(fields, EVENT_FIELDS)
+    tz = get_timezone(timezone)
+    found = {event.id: event for event in await crud.get_events_by_ids(db, event_ids, fields=selected)}
+    return {
+        "events": [serialize_event(found[event_id], tz) if selected is None
+                   else serialize_sparse_event(found[event_id], tz, selected)
+                   for event_id in event_ids if event_id in found],
+        "missing": [event_id for event_id in event_ids if event_id not in found],
+    }
 
 async def register_attendee_service(db: AsyncSession, event_id: int, reg: RegistrationCreate):
-    event = await crud.get_event(db, event_id)
-    if not event:
+    if crud.is_unknown_event(event_id):
         raise HTTPException(status_code=404, detail="Event not found")
-    attendee = await crud.get_attendee_by_email(db, reg.email)
-    if not attendee:
-        attendee = await crud.create_attendee(db, AttendeeCreate(name=reg.name, email=reg.email))
+    # Fast rejections for the common retries during a rush. The duplicate
+    # filter can report false positives, so its hits are confirmed by a
+    # single indexed read instead of the locking registration transaction.
+    if crud.is_sold_out(event_id):
+        REGISTRATIONS.inc("full")
+        raise HTTPException(status_code=400, detail="Event is fully booked.")
+    if crud.maybe_registered(event_id, reg.email) and await crud.is_registered(db, event_id, reg.email):
+        REGISTRATIONS.inc("duplicate")
+        raise HTTPException(status_code=400, detail="Attendee already registered for this event.")
     try:
-        registration = await crud.register_attendee(db, event, attendee)
-    except ValueError as e:
+        registration = await crud.register_attendee(db, event_id, reg)
+    except crud.EventFullError as e:
+        REGISTRATIONS.inc("full")
+        raise HTTPException(status_code=400, detail=str(e))
+    except crud.AlreadyRegisteredError as e:
+        REGISTRATIONS.inc("duplicate")
         raise HTTPException(status_code=400, detail=str(e))
+    if registration is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    REGISTRATIONS.inc("accepted")
+    broadcaster.changed(event_id)
     return registration
 
-async def get_attendees_service(db: AsyncSession, event_id: int, page: int = 1, size: int = 10) -> PaginatedAttendees:
-    event = await crud.get_event(db, event_id)
-    if not event:
+def submit_registration_service(event_id: int, reg: RegistrationCreate) -> RegistrationTicket:
+    """Queue a registration for the intake writer and return its pending ticket."""
+    if crud.is_unknown_event(event_id):
         raise HTTPException(status_code=404, detail="Event not found")
+    if crud.is_sold_out(event_id):
+        REGISTRATIONS.inc("full")
+        raise HTTPException(status_code=400, detail="Event is fully booked.")
+    try:
+        return intake.submit(event_id, reg)
+    except IntakeFull:
+        raise HTTPException(status_code=503, detail="Too many pending registrations, please retry.",
+                            headers={"Retry-After": "1"})
+
+def get_registration_ticket_service(ticket: str) -> RegistrationTicket:
+    registration_ticket = intake.get(ticket)
+    if registration_ticket is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return registration_ticket
+
+async def cancel_registration_service(db: AsyncSession, event_id: int, attendee_id: int) -> None:
+    if not await crud.cancel_registration(db, event_id, attendee_id):
+        raise HTTPException(status_code=404, detail="Registration not found")
+    broadcaster.changed(event_id)
+
+MAX_BULK_ROWS = 50_000
+
+def parse_bulk_registrations(body: bytes, content_type: str) -> List[Any]:
+    """Parse a bulk registration body: a JSON array, or NDJSON (one object per line)."""
+    try:
+        if "ndjson" in content_type or "jsonl" in content_type:
+            rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed JSON body")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON body")
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} registrations per request")
+    return rows
+
+async def bulk_register_service(db: AsyncSession, event_id: int, rows: List[Any]) -> BulkRegistrationResult:
+    results = [None] * len(rows)
+    unique = {}  # email -> (index, RegistrationCreate), first occurrence wins
+    for index, row in enumerate(rows):
+        try:
+            reg = RegistrationCreate.model_validate(row)
+        except ValidationError as e:
+            email = row.get("email") if isinstance(row, dict) else None
+            results[index] = BulkRegistrationRow(index=index, email=email if isinstance(email, str) else None,
+                                                 status="invalid", detail=str(e.errors()[0]["msg"]))
+            continue
+        if reg.email in unique:
+            results[index] = BulkRegistrationRow(index=index, email=reg.email, status="duplicate",
+                                                 detail="Email appears earlier in this request.")
+            continue
+        unique[reg.email] = (index, reg)
+
+    if crud.is_unknown_event(event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+    outcome = await crud.bulk_register_attendees(db, event_id, [reg for _, reg in unique.values()])
+    if outcome is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    for email, (index, _) in unique.items():
+        row_status, registration_id, attendee_id = outcome[email]
+        results[index] = BulkRegistrationRow(index=index, email=email, status=row_status,
+                                             registration_id=registration_id, attendee_id=attendee_id)
+    counts = Counter(r.status for r in results)
+    for result, row_status in (("accepted", "created"), ("duplicate", "duplicate"), ("full", "full")):
+        if counts[row_status]:
+            REGISTRATIONS.inc(result, amount=counts[row_status])
+    if counts["created"]:
+        broadcaster.changed(event_id)
+    return BulkRegistrationResult(
+        created=counts["created"],
+        duplicate=counts["duplicate"],
+        full=counts["full"],
+        invalid=counts["invalid"],
+        results=results
+    )
+
+def encode_cursor(registration_id: int) -> str:
+    """Encode a registration id as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(f"r:{registration_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed or out of range."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, _, value = raw.partition(":")
+        registration_id = int(value)
+        if prefix != "r" or not 1 <= registration_id <= INT_MAX:
+            raise ValueError
+        return registration_id
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+async def get_attendees_service(db: AsyncSession, event_id: int, page: int = 1, size: int = 10,
+                                after: Optional[str] = None, include_total: Optional[bool] = None,
+                                if_none_match: Optional[str] = None,
+                                if_modified_since: Optional[str] = None,
+                                include_archived: bool = False, fields: Optional[str] = None) -> Conditional:
+    """One page of an event's attendees, with validators from the event's version.
+
+    Every registration and cancellation bumps the event's version, so a
+    single-row read decides whether the client's copy is current; if it is,
+    the content is None. Archived events are only found with
+    ``include_archived``. With ``fields`` the content is a plain dict whose
+    attendees hold only those keys, ready for FastJSONResponse.
+    """
+    selected = parse_fields(fields, ATTENDEE_FIELDS)
+    # Unknown ids are cached as on the registration path, so floods of 404s stay off the database
+    if not include_archived and crud.is_unknown_event(event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+    current = await crud.get_event_version(db, event_id)
+    if current is None:
+        crud.mark_unknown_event(db, event_id)
+    archived = current is None and include_archived
+    if archived:
+        current = await crud.get_event_version(db, event_id, archived=True)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    after_id = None
+    if after is not None:
+        try:
+            after_id = decode_cursor(after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    # Page mode keeps returning the total; cursor mode only counts when asked to
+    if include_total is None:
+        include_total = after_id is None
+    etag = make_etag(event_id, current.version, page, size, after_id, include_total, selected)
+    # If-None-Match takes precedence; If-Modified-Since only counts without it
+    if etag_matches(if_none_match, etag) or (
+            not if_none_match and not_modified_since(if_modified_since, current.updated_at)):
+        return Conditional(etag, current.updated_at, None)
     skip = (page - 1) * size
-    attendees = await crud.get_attendees_for_event(db, event_id, skip=skip, limit=size)
-    total = await crud.count_attendees_for_event(db, event_id)
-    attendees_out = [AttendeeOut.from_orm(a) for a in attendees]
-    return PaginatedAttendees(
+    # Fetch one extra row to know whether another page follows
+    rows = await crud.get_attendees_for_event(db, event_id, skip=skip, limit=size + 1, after_id=after_id,
+                                              archived=archived, fields=selected)
+    next_cursor = encode_cursor(rows[size - 1].registration_id) if len(rows) > size else None
+    # registered_count is maintained on the event row, so the total is free
+    total = current.registered_count if include_total else None
+    if selected is not None:
+        return Conditional(etag, current.updated_at, {
+            "total": total,
+            "page": page,
+            "size": size,
+            "next_cursor": next_cursor,
+            "attendees": [{field: getattr(row, field) for field in selected} for row in rows[:size]],
+        })
+    attendees_out = [AttendeeOut.from_orm(attendee) for attendee, _ in rows[:size]]
+    return Conditional(etag, current.updated_at, PaginatedAttendees(
         total=total,
         page=page,
         size=size,
+        next_cursor=next_cursor,
         attendees=attendees_out
-    ) 
\ No newline at end of file
+    ))
+
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+async def export_attendees_service(db: AsyncSession, event_id: int, format: str = "csv",
+                                   include_archived: bool = False) -> AsyncIterator[str]:
+    """Check the event exists and return a generator of export chunks.
+
+    The generator opens its own session on the same engine (primary or
+    replica): the request-scoped one is closed before a streaming response
+    starts sending.
+    """
+    archived = False
+    if not await crud.get_event_cached(db, event_id):
+        archived = include_archived and await crud.get_event_version(db, event_id, archived=True) is not None
+        if not archived:
+            raise HTTPException(status_code=404, detail="Event not found")
+
+    async def chunks():
+        async with AsyncSessionLocal(bind=db.bind) as session:
+            if format == "csv":
+                yield "id,name,email\r\n"
+            async for batch in crud.stream_attendees_for_event(session, event_id, archived=archived):
+                if format == "csv":
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(batch)
+                    yield buffer.getvalue()
+                else:
+                    yield "".join(
+                        json.dumps({"id": id, "name": name, "email": email}) + "\n"
+                        for id, name, email in batch
+                    )
+
+    return chunks()
+
+
+def format_sse(data: dict, event: str, id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if id is not None:
+        lines.append(f"id: {id}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+async def live_seats_service(event_id: int, keepalive: float = 15.0) -> AsyncIterator[str]:
+    """Check the event exists and return a generator of Server-Sent Events with its seat counts.
+
+    The first message is the current state; later ones follow registrations
+    and cancellations (merged by the broadcaster), each with the event's
+    version as its id. A comment is sent after ``keepalive`` quiet seconds so
+    proxies keep the connection open.
+    """
+    initial = await broadcaster.load(event_id)
+    if initial is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    async def events():
+        subscription = broadcaster.subscribe(event_id)
+        subscription.put(initial)
+        # Catches changes made since the state was loaded
+        broadcaster.changed(event_id)
+        sent_version = None
+        try:
+            while True:
+                try:
+                    state = await subscription.get(keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if state is None:
+                    yield format_sse({"event_id": event_id}, "gone")
+                    return
+                if state["version"] != sent_version:
+                    sent_version = state["version"]
+                    yield format_sse(state, "seats", id=sent_version)
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return events()
@@ -0,0 +1,81 @@
+"""Micro-benchmark for the cost of recording metrics.
+
+Times the metric updates on their own (a labelled counter increment and a
+histogram observation, as done for every registration and every request),
+then the per-request overhead of MetricsMiddleware on a trivial in-process
+endpoint. No database is needed.
+
+    python -m benchmarks.bench_metrics --iterations 200000
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.metrics import Counter, Histogram, MetricsMiddleware
+
+
+def time_op(op, iterations: int) -> float:
+    """Mean cost of ``op()`` in nanoseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        op()
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def make_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+
+    @app.get("/events/{event_id}")
+    async def get_event(event_id: int):
+        return {"id": event_id}
+
+    return app
+
+
+async def time_requests(app: FastAPI, requests: int) -> float:
+    """Mean in-process request latency in microseconds."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for i in range(100):
+            await client.get(f"/events/{i}")
+        start = time.perf_counter()
+        for i in range(requests):
+            await client.get(f"/events/{i}")
+        return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(iterations: int, requests: int, max_op_ns: float):
+    counter = Counter("bench_registrations_total", "Benchmark counter", ["result"])
+    histogram = Histogram("bench_request_duration_seconds", "Benchmark histogram", ["method", "route", "status"])
+    counter_ns = time_op(lambda: counter.inc("accepted"), iterations)
+    histogram_ns = time_op(lambda: histogram.observe(0.004, "POST", "/events/{event_id}/register", "201"), iterations)
+    print(f"counter.inc        {counter_ns:8.0f} ns")
+    print(f"histogram.observe  {histogram_ns:8.0f} ns")
+
+    # Alternate the runs so drift affects both sides equally
+    plain_us, metered_us = [], []
+    for _ in range(3):
+        plain_us.append(await time_requests(make_app(False), requests))
+        metered_us.append(await time_requests(make_app(True), requests))
+    plain, metered = min(plain_us), min(metered_us)
+    print(f"request without metrics {plain:8.1f} us  with metrics {metered:8.1f} us  "
+          f"overhead {metered - plain:6.1f} us ({(metered - plain) / plain:+.1%})")
+
+    worst = max(counter_ns, histogram_ns)
+    print(f"slowest metric update {worst:.0f} ns (limit {max_op_ns:.0f} ns)")
+    return worst <= max_op_ns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--max-op-ns", type=float, default=2_000)
+    args = parser.parse_args()
+    ok = asyncio.run(main(args.iterations, args.requests, args.max_op_ns))
+    sys.exit(0 if ok else 1)
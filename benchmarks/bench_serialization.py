@@ -0,0 +1,87 @@
+"""Micro-benchmark for serializing a page of events.
+
+Compares the validated path (EventOut.from_orm per row, a pytz lookup per
+conversion, FastAPI response_model validation and JSONResponse) with the
+trusted-row path used by GET /events (serialize_event + FastJSONResponse).
+No database is needed; rows are built in memory.
+
+    python -m benchmarks.bench_serialization --events 100
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytz
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.main import app
+from app.models import Event
+from app.responses import FastJSONResponse
+from app.schemas import EventOut, PaginatedEvents
+from app.services import get_timezone, serialize_event
+
+TIMEZONE = "America/New_York"
+
+
+def make_events(n: int):
+    # asyncpg returns timestamptz values with datetime.timezone.utc
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    return [
+        Event(id=i, name=f"Event {i}", location=f"Location {i}", start_time=start + timedelta(hours=i),
+              end_time=start + timedelta(hours=i + 2), max_capacity=100, registered_count=i % 100)
+        for i in range(n)
+    ]
+
+
+def validated_page(events):
+    events_out = []
+    for event in events:
+        event_out = EventOut.from_orm(event)
+        event_out.start_time = event_out.start_time.astimezone(pytz.timezone(TIMEZONE))
+        event_out.end_time = event_out.end_time.astimezone(pytz.timezone(TIMEZONE))
+        events_out.append(event_out)
+    return PaginatedEvents(total=len(events), page=1, size=len(events), events=events_out)
+
+
+async def validated_path(events, response_field):
+    content = await serialize_response(field=response_field, response_content=validated_page(events))
+    return JSONResponse(content).body
+
+
+async def fast_path(events, response_field):
+    tz = get_timezone(TIMEZONE)
+    content = {"total": len(events), "page": 1, "size": len(events),
+               "events": [serialize_event(event, tz) for event in events]}
+    return FastJSONResponse(content).body
+
+
+async def time_path(path, events, response_field, iterations: int) -> float:
+    await path(events, response_field)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await path(events, response_field)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def main(n: int, iterations: int, min_speedup: float):
+    route = next(r for r in app.routes if getattr(r, "path", None) == "/events/" and "GET" in r.methods)
+    events = make_events(n)
+    validated_us = await time_path(validated_path, events, route.response_field, iterations)
+    fast_us = await time_path(fast_path, events, route.response_field, iterations)
+    speedup = validated_us / fast_us
+    print(f"{n} events  validated path {validated_us:9.1f} us  fast path {fast_us:9.1f} us  "
+          f"speedup {speedup:.1f}x (minimum {min_speedup}x)")
+    return speedup >= min_speedup
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--min-speedup", type=float, default=3.0)
+    args = parser.parse_args()
+    ok = asyncio.run(main(args.events, args.iterations, args.min_speedup))
+    sys.exit(0 if ok else 1)
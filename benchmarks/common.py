@@ -0,0 +1,45 @@
+"""Shared setup for the benchmarks.
+
+Importing this module points the app at BENCH_DATABASE_URL, so it must be
+imported before anything from ``app``.
+"""
+import os
+import statistics
+import time
+
+os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+
+from app.database import get_engine
+from app.models import Base
+
+
+async def reset_database():
+    """Recreate the schema from the models, leaving every table empty."""
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def time_calls(call, iterations: int) -> float:
+    """Await ``call()`` ``iterations`` times and return the median latency in ms."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def summarize(timings, elapsed: float, errors: int = 0) -> dict:
+    """Throughput and latency percentiles (ms) for one workload."""
+    cuts = statistics.quantiles(timings, n=100, method="inclusive") if len(timings) > 1 else timings * 99
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "rps": round(len(timings) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+        "p99_ms": round(cuts[98], 2),
+        "max_ms": round(max(timings), 2),
+    }
@@ -0,0 +1,5 @@
+import os
+
+# Tests that need a database connect to DATABASE_URL and skip when it is
+# unreachable; without a .env this placeholder makes them skip.
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test")
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+import pytest
+from httpx import AsyncClient
+
+BASE_URL = "http://localhost:8000"
+
+
+@pytest.mark.asyncio
+async def test_archived_event_needs_include_archived():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        event_resp = await ac.post("/events/", json={
+            "name": "Ancient Event",
+            "location": "Old Town",
+            "start_time": "2015-03-01T10:00:00+05:30",
+            "end_time": "2015-03-01T12:00:00+05:30",
+            "max_capacity": 5
+        })
+        event_id = event_resp.json()["id"]
+        for i in range(3):
+            await ac.post(f"/events/{event_id}/register", json={"name": f"Old{i}", "email": f"old{i}@example.com"})
+        before = (await ac.get(f"/events/{event_id}/attendees")).json()
+
+        # Only events that ended before 2018 or so
+        out = subprocess.run([sys.executable, "-m", "app.archive", "--older-than-days", "3000", "--pause", "0"],
+                             check=True, capture_output=True, text=True)
+        assert "archived" in out.stdout
+
+        resp = await ac.get(f"/events/{event_id}/attendees")
+        assert resp.status_code == 404
+        resp = await ac.get(f"/events/{event_id}/attendees", params={"include_archived": "true"})
+        assert resp.status_code == 200
+        assert resp.json() == before
+        resp = await ac.get(f"/events/{event_id}/attendees/export", params={"include_archived": "true"})
+        assert resp.status_code == 200
+        assert resp.text.count("@example.com") == 3
+        resp = await ac.post(f"/events/{event_id}/register", json={"name": "Late", "email": "late-old@example.com"})
+        assert resp.status_code == 404
@@ -0,0 +1,63 @@
+from app.cache import MISSING, BloomFilter, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"
+    cache.set(3, "c")
+    assert cache.get(2) is MISSING
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+    assert len(cache) == 2
+
+
+def test_entries_expire_and_negative_entries_expire_sooner():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, negative_ttl=1, clock=clock)
+    cache.set("event", "row")
+    cache.set("unknown", None)
+    assert cache.get("unknown") is None
+    clock.now = 2
+    assert cache.get("unknown") is MISSING
+    assert cache.get("event") == "row"
+    clock.now = 11
+    assert cache.get("event") is MISSING
+
+
+def test_hit_miss_counters_and_invalidation():
+    cache = TTLCache()
+    cache.get(1)
+    cache.set(1, "a")
+    cache.get(1)
+    cache.invalidate(1)
+    cache.get(1)
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 2}
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    keys = [f"1:person{i}@example.com" for i in range(10_000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(bloom.might_contain(key) for key in keys)
+    false_positives = sum(bloom.might_contain(f"2:person{i}@example.com") for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_bloom_filter_resets_when_over_capacity():
+    bloom = BloomFilter(capacity=2)
+    bloom.add("a")
+    bloom.add("b")
+    bloom.add("c")
+    assert bloom.count == 1
+    assert bloom.might_contain("c")
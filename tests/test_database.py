@@ -0,0 +1,147 @@
+import asyncio
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import crud, services
+from app.config import get_settings
+from app.database import InstrumentedQueuePool, ReplicaSet, pool_stats, warm_up
+from app.schemas import EventCreate, RegistrationCreate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_importing_reads_no_settings():
+    # .env and the environment are read when settings are first needed, not at import
+    code = (
+        "import dotenv\n"
+        "calls = []\n"
+        "dotenv.load_dotenv = lambda *args, **kwargs: calls.append(1)\n"
+        "import app.config, app.database\n"
+        "assert calls == [], 'settings read at import'\n"
+        "app.config.get_settings(); app.config.get_settings()\n"
+        "assert calls == [1]\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_replicas_round_robin():
+    replicas = ReplicaSet(["a", "b", "c"])
+    assert [replicas.pick() for _ in range(4)] == ["a", "b", "c", "a"]
+
+
+def test_unhealthy_replica_is_skipped_until_retry():
+    clock = FakeClock()
+    replicas = ReplicaSet(["a", "b"], retry_after=5, clock=clock)
+    replicas.mark_down("a")
+    assert [replicas.pick() for _ in range(3)] == ["b", "b", "b"]
+    clock.now = 6
+    assert {replicas.pick(), replicas.pick()} == {"a", "b"}
+
+
+def test_no_healthy_replica_means_primary():
+    replicas = ReplicaSet(["a"], retry_after=5, clock=FakeClock())
+    replicas.mark_down("a")
+    assert replicas.pick() is None
+    assert ReplicaSet([]).pick() is None
+
+
+@pytest.mark.asyncio
+async def test_warm_up_fills_the_pool(tmp_path):
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/warm.db", pool_size=4)
+    prepared = []
+
+    async def prepare(session):
+        prepared.append((await session.execute(text("SELECT 1"))).scalar())
+
+    try:
+        assert await warm_up(engine, 3, prepare) == 3
+        assert prepared == [1, 1, 1]
+        assert engine.pool.checkedin() == 3
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_track_checkouts_overflow_and_waits(tmp_path):
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/pool.db", poolclass=InstrumentedQueuePool,
+                                 pool_size=1, max_overflow=1, pool_timeout=0.2)
+    try:
+        first = await engine.connect()
+        second = await engine.connect()
+        stats = pool_stats(engine)
+        assert (stats["checked_out"], stats["overflow"], stats["checkouts"]) == (2, 1, 2)
+
+        # Pool and overflow are in use: the next checkout waits pool_timeout, then fails
+        with pytest.raises(exc.TimeoutError):
+            await engine.connect()
+        stats = pool_stats(engine)
+        assert stats["checkout_timeouts"] == 1
+        assert stats["checkouts"] == 3
+        assert stats["max_wait_ms"] >= 190
+        assert 0 < stats["avg_wait_ms"] < stats["max_wait_ms"]
+
+        # A waiting checkout gets the first connection returned
+        async def checkout():
+            return await engine.connect()
+
+        waiting = asyncio.create_task(checkout())
+        await asyncio.sleep(0.05)
+        await first.close()
+        await (await waiting).close()
+        await second.close()
+        stats = pool_stats(engine)
+        assert (stats["checked_out"], stats["overflow"], stats["checkout_timeouts"]) == (0, 0, 1)
+        assert stats["checkouts"] == 4
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_misses_on_a_lagging_replica_are_not_cached():
+    engine = create_async_engine(get_settings().database_url)
+    # A snapshot taken before the event exists stands in for a replica behind the primary
+    lagging = AsyncSession(engine)
+    lagging.info["replica"] = True
+    try:
+        try:
+            conn = await lagging.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            await conn.execute(text("SELECT 1"))
+        except (OSError, exc.DBAPIError):
+            pytest.skip("DATABASE_URL is not reachable")
+        start = datetime.now(timezone.utc) + timedelta(days=900)
+        async with AsyncSession(engine) as db:
+            event = await crud.create_event(db, EventCreate(
+                name="Replica Lag Event", location="Lag City", start_time=start,
+                end_time=start + timedelta(hours=2), max_capacity=10))
+
+        with pytest.raises(HTTPException) as raised:
+            await services.get_attendees_service(lagging, event.id)
+        assert raised.value.status_code == 404
+        assert await crud.get_event_cached(lagging, event.id) is None
+        assert not crud.is_unknown_event(event.id)
+        async with AsyncSession(engine) as db:
+            registration = await crud.register_attendee(
+                db, event.id, RegistrationCreate(name="Lagged", email=f"lag-{event.id}@example.com"))
+        assert registration is not None
+
+        # Misses on the primary are still cached
+        async with AsyncSession(engine) as db:
+            assert await crud.get_event_cached(db, event.id + 1_000_000) is None
+        assert crud.is_unknown_event(event.id + 1_000_000)
+    finally:
+        await lagging.close()
+        await engine.dispose()
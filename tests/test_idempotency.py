@@ -0,0 +1,120 @@
+import asyncio
+import re
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import RedirectResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.idempotency import IDEMPOTENT_ROUTES, IdempotencyMiddleware, IdempotencyStore
+
+
+def make_app():
+    calls = []
+    gate = asyncio.Event()
+    gate.set()
+    app = FastAPI()
+
+    @app.post("/events/{event_id}/register", status_code=201)
+    async def register(event_id: int, body: dict):
+        calls.append(body)
+        await gate.wait()
+        if body.get("fail"):
+            raise HTTPException(status_code=500, detail="boom")
+        return {"event_id": event_id, "call": len(calls)}
+
+    store = IdempotencyStore(maxsize=10, ttl=60)
+    app.add_middleware(IdempotencyMiddleware, store=store)
+    return app, calls, gate, store
+
+
+def client_for(app):
+    return AsyncClient(transport=ASGITransport(app=app, raise_app_exceptions=False), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_retry_is_replayed_without_calling_the_endpoint():
+    app, calls, _, store = make_app()
+    async with client_for(app) as client:
+        first = await client.post("/events/1/register", json={"email": "a@example.com"},
+                                  headers={"Idempotency-Key": "k1"})
+        retry = await client.post("/events/1/register", json={"email": "a@example.com"},
+                                  headers={"Idempotency-Key": "k1"})
+        other = await client.post("/events/1/register", json={"email": "a@example.com"},
+                                  headers={"Idempotency-Key": "k2"})
+        plain = await client.post("/events/1/register", json={"email": "a@example.com"})
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json() == {"event_id": 1, "call": 1}
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert other.json()["call"] == 2 and plain.json()["call"] == 3
+    assert len(calls) == 3
+    assert not store.in_flight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_wait_for_the_first():
+    app, calls, gate, store = make_app()
+    gate.clear()
+    async with client_for(app) as client:
+        requests = [asyncio.create_task(client.post("/events/1/register", json={"email": "b@example.com"},
+                                                    headers={"Idempotency-Key": "same"}))
+                    for _ in range(5)]
+        await asyncio.sleep(0.05)
+        assert len(calls) == 1
+        assert "same" in store.in_flight
+        gate.set()
+        responses = await asyncio.gather(*requests)
+    assert len(calls) == 1
+    assert {r.status_code for r in responses} == {201}
+    assert {r.json()["call"] for r in responses} == {1}
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 4
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_not_stored_and_keys_are_bound_to_the_request():
+    app, calls, _, _ = make_app()
+    async with client_for(app) as client:
+        failed = await client.post("/events/1/register", json={"fail": True}, headers={"Idempotency-Key": "f"})
+        again = await client.post("/events/1/register", json={"fail": True}, headers={"Idempotency-Key": "f"})
+        assert failed.status_code == again.status_code == 500
+        assert len(calls) == 2
+
+        await client.post("/events/1/register", json={"email": "c@example.com"}, headers={"Idempotency-Key": "c"})
+        reused = await client.post("/events/2/register", json={"email": "c@example.com"},
+                                   headers={"Idempotency-Key": "c"})
+        assert reused.status_code == 422
+        too_long = await client.post("/events/1/register", json={}, headers={"Idempotency-Key": "x" * 256})
+        assert too_long.status_code == 400
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_redirects_are_not_stored():
+    created = []
+    app = FastAPI()
+
+    @app.post("/events/", status_code=201)
+    async def create(body: dict):
+        created.append(body)
+        return {"id": len(created)}
+
+    @app.post("/moved")
+    async def moved():
+        return RedirectResponse("/events/", status_code=307)
+
+    app.add_middleware(IdempotencyMiddleware, store=IdempotencyStore(maxsize=10, ttl=60),
+                       routes=IDEMPOTENT_ROUTES + (("POST", re.compile(r"/moved")),))
+    async with client_for(app) as client:
+        # The trailing-slash redirect, followed with the same key
+        redirect = await client.post("/events", json={"name": "a"}, headers={"Idempotency-Key": "r"})
+        assert redirect.status_code == 307
+        first = await client.post("/events/", json={"name": "a"}, headers={"Idempotency-Key": "r"})
+        retry = await client.post("/events/", json={"name": "a"}, headers={"Idempotency-Key": "r"})
+        assert first.status_code == retry.status_code == 201
+        assert retry.headers["idempotent-replayed"] == "true"
+
+        # A redirect from an idempotent route leaves the key free for its target
+        assert (await client.post("/moved", json={}, headers={"Idempotency-Key": "m"})).status_code == 307
+        assert (await client.post("/events/", json={}, headers={"Idempotency-Key": "m"})).status_code == 201
+    assert len(created) == 2
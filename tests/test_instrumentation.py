@@ -0,0 +1,46 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+
+from app.instrumentation import QueryBudgetWarning, QueryStatsMiddleware
+
+
+def make_app(budget: int = 0) -> FastAPI:
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, budget=budget)
+
+    @app.get("/queries/{n}")
+    def run_queries(n: int):
+        with engine.connect() as conn:
+            for _ in range(n):
+                conn.execute(text("SELECT 1"))
+        return {"ran": n}
+
+    return app
+
+
+async def get(app: FastAPI, path: str):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path)
+
+
+@pytest.mark.asyncio
+async def test_server_timing_counts_statements():
+    resp = await get(make_app(), "/queries/3")
+    assert resp.status_code == 200
+    assert 'desc="3 queries"' in resp.headers["server-timing"]
+    assert "app;dur=" in resp.headers["server-timing"]
+
+
+@pytest.mark.asyncio
+async def test_query_budget_warns():
+    with pytest.warns(QueryBudgetWarning, match="ran 5 SQL statements"):
+        await get(make_app(budget=4), "/queries/5")
+
+
+@pytest.mark.asyncio
+async def test_query_budget_not_exceeded(recwarn):
+    await get(make_app(budget=4), "/queries/4")
+    assert not [w for w in recwarn if issubclass(w.category, QueryBudgetWarning)]
@@ -0,0 +1,77 @@
+import pytest
+
+from app.intake import IntakeFull, RegistrationIntake
+from app.schemas import RegistrationCreate
+
+
+class FakeWriter:
+    """Stands in for crud.bulk_register_attendees: `seats` per event, first come first served."""
+
+    def __init__(self, seats: int):
+        self.seats = seats
+        self.registered = {}
+        self.batches = []
+
+    async def __call__(self, event_id, regs):
+        if event_id == 404:
+            return None
+        self.batches.append((event_id, [reg.email for reg in regs]))
+        emails = self.registered.setdefault(event_id, [])
+        outcome = {}
+        for reg in regs:
+            if reg.email in emails:
+                outcome[reg.email] = ("duplicate", None, None)
+            elif len(emails) < self.seats:
+                emails.append(reg.email)
+                outcome[reg.email] = ("created", len(emails), len(emails))
+            else:
+                outcome[reg.email] = ("full", None, None)
+        return outcome
+
+
+def reg(n: int) -> RegistrationCreate:
+    return RegistrationCreate(name=f"Person {n}", email=f"person{n}@example.com")
+
+
+@pytest.mark.asyncio
+async def test_batches_enforce_capacity_in_arrival_order():
+    writer = FakeWriter(seats=2)
+    intake = RegistrationIntake(batch_size=10, writer=writer)
+    tickets = [intake.submit(1, reg(n)) for n in range(3)]
+    tickets.append(intake.submit(1, reg(0)))
+    tickets.append(intake.submit(404, reg(5)))
+    assert {t.status for t in tickets} == {"pending"}
+    intake.start()
+    await intake.stop()
+    statuses = [intake.get(t.ticket).status for t in tickets]
+    assert statuses == ["created", "created", "full", "duplicate", "not_found"]
+    # One batch, one write per event, each email once
+    assert writer.batches == [(1, ["person0@example.com", "person1@example.com", "person2@example.com"])]
+    assert intake.get(tickets[2].ticket).detail == "Event is fully booked."
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue():
+    intake = RegistrationIntake(queue_size=1, writer=FakeWriter(seats=1))
+    intake.submit(1, reg(1))
+    with pytest.raises(IntakeFull):
+        intake.submit(1, reg(2))
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_keeps_writer_running():
+    calls = []
+
+    async def flaky(event_id, regs):
+        calls.append(event_id)
+        if len(calls) == 1:
+            raise OSError("connection reset")
+        return {r.email: ("created", 1, 1) for r in regs}
+
+    intake = RegistrationIntake(batch_size=1, writer=flaky)
+    first, second = intake.submit(1, reg(1)), intake.submit(1, reg(2))
+    intake.start()
+    await intake.stop()
+    assert intake.get(first.ticket).status == "failed"
+    assert intake.get(second.ticket).status == "created"
+    assert intake.get("unknown") is None
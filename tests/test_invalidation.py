@@ -0,0 +1,138 @@
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+import httpx
+import pytest
+
+from app.config import get_settings
+from app.invalidation import WORKER_ID, InvalidationListener, listen_dsn
+
+
+class Recorder:
+    def __init__(self):
+        self.evicted = []
+        self.flushes = 0
+
+    def evict(self, event_id):
+        self.evicted.append(event_id)
+
+    def flush(self):
+        self.flushes += 1
+
+
+def test_handle_skips_own_notifications_and_flushes_on_garbage():
+    recorder = Recorder()
+    listener = InvalidationListener("", evict=recorder.evict, flush=recorder.flush)
+    listener.handle("otherwkr:42")
+    listener.handle(f"{WORKER_ID}:7")
+    assert recorder.evicted == [42]
+    listener.handle("otherwkr:not-an-id")
+    assert recorder.flushes == 1
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_listener_evicts_and_reconnects():
+    dsn = listen_dsn(get_settings().database_url)
+    try:
+        # Stands in for another worker publishing its writes
+        publisher = await asyncpg.connect(dsn, timeout=5)
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError):
+        pytest.skip("DATABASE_URL is not reachable")
+    recorder = Recorder()
+    listener = InvalidationListener(dsn, channel="test_invalidation", reconnect_delay=0.05,
+                                    evict=recorder.evict, flush=recorder.flush)
+    listener.start()
+    try:
+        await asyncio.wait_for(listener.listening.wait(), 5)
+        await publisher.execute("SELECT pg_notify('test_invalidation', 'otherwkr:42')")
+        await wait_for(lambda: recorder.evicted == [42])
+        assert recorder.flushes == 0
+
+        # Notifications sent while disconnected are lost, so the caches are flushed
+        await publisher.execute("SELECT pg_terminate_backend($1)", listener.pid)
+        await wait_for(lambda: listener.connections == 2 and listener.listening.is_set())
+        assert recorder.flushes == 2
+        await publisher.execute("SELECT pg_notify('test_invalidation', 'otherwkr:43')")
+        await wait_for(lambda: recorder.evicted == [42, 43])
+    finally:
+        await listener.stop()
+        await publisher.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def two_workers():
+    """Two uvicorn processes on the database in DATABASE_URL (with migrations applied)."""
+    async def probe():
+        await (await asyncpg.connect(listen_dsn(get_settings().database_url), timeout=5)).close()
+
+    try:
+        asyncio.run(probe())
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError):
+        pytest.skip("DATABASE_URL is not reachable")
+    ports = [free_port(), free_port()]
+    workers = [
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"])
+        for port in ports
+    ]
+    try:
+        urls = [f"http://127.0.0.1:{port}" for port in ports]
+        deadline = time.monotonic() + 20
+        for url in urls:
+            while True:
+                try:
+                    if httpx.get(url + "/internal/ready").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or any(worker.poll() is not None for worker in workers):
+                    pytest.fail("workers did not become ready")
+                time.sleep(0.05)
+        yield urls
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+
+
+@pytest.mark.asyncio
+async def test_cancel_on_one_worker_reopens_event_on_another(two_workers):
+    first, second = two_workers
+    async with httpx.AsyncClient() as client:
+        start = datetime.now(timezone.utc) + timedelta(days=900)
+        event_resp = await client.post(first + "/events/", json={
+            "name": "Two Worker Event",
+            "location": "Cluster City",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "max_capacity": 1
+        })
+        event_id = event_resp.json()["id"]
+        taken = await client.post(f"{first}/events/{event_id}/register", json={"name": "A", "email": "worker-a@example.com"})
+        assert taken.status_code == 201
+        # The second worker now remembers the event as sold out
+        resp = await client.post(f"{second}/events/{event_id}/register", json={"name": "B", "email": "worker-b@example.com"})
+        assert resp.status_code == 400
+        resp = await client.delete(f"{first}/events/{event_id}/attendees/{taken.json()['attendee_id']}")
+        assert resp.status_code == 204
+        # Well within SOLD_OUT_TTL: only the notification can have cleared it
+        await asyncio.sleep(0.2)
+        resp = await client.post(f"{second}/events/{event_id}/register", json={"name": "B", "email": "worker-b@example.com"})
+        assert resp.status_code == 201
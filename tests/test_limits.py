@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.limits import AdaptiveLimit, ConcurrencyLimitMiddleware, route_class
+from app.metrics import LOAD_SHED
+
+
+def test_route_class():
+    assert route_class("POST", "/events/7/register") == "registration"
+    assert route_class("POST", "/events/7/register/bulk") == "registration"
+    assert route_class("DELETE", "/events/7/attendees/3") == "registration"
+    assert route_class("GET", "/events/") == "listing"
+    assert route_class("GET", "/events/batch") == "listing"
+    assert route_class("GET", "/events/7/attendees") == "listing"
+    assert route_class("GET", "/events/7/attendees/export") is None
+    assert route_class("GET", "/events/7/live") is None
+    assert route_class("POST", "/events/") is None
+
+
+def test_adaptive_limit_backs_off_on_latency_and_recovers():
+    now = [0.0]
+    limit = AdaptiveLimit("test", initial=10, min_limit=2, max_limit=12, latency_target=0.1, clock=lambda: now[0])
+    for _ in range(10):
+        assert limit.try_acquire()
+    assert not limit.try_acquire()
+
+    # A burst of slow completions within one window is a single decrease
+    for _ in range(5):
+        limit.release(0.5)
+    assert limit.limit == pytest.approx(9)
+    now[0] += 0.2
+    limit.release(0.5)
+    assert limit.limit == pytest.approx(8.1)
+
+    # Fast completions only grow a limit that is in use
+    for _ in range(4):
+        limit.release(0.01)
+    assert limit.in_flight == 0
+    assert limit.limit == pytest.approx(8.1)
+    for _ in range(200):
+        while limit.try_acquire():
+            pass
+        limit.release(0.01)
+    assert limit.limit == 12
+
+    for _ in range(100):
+        now[0] += 1
+        limit.release(0.01, failed=True)
+        limit.try_acquire()
+    assert limit.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_over_the_limit_gets_503_without_waiting():
+    gate = asyncio.Event()
+    app = FastAPI()
+
+    @app.post("/events/{event_id}/register")
+    async def register(event_id: int):
+        await gate.wait()
+        return {"event_id": event_id}
+
+    @app.post("/events/")
+    async def create():
+        return {}
+
+    limits = {"registration": AdaptiveLimit("registration", initial=2, min_limit=1, latency_target=10)}
+    app.add_middleware(ConcurrencyLimitMiddleware, limits=limits, retry_after=3)
+    shed = LOAD_SHED.value("registration")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        admitted = [asyncio.create_task(client.post(f"/events/{i}/register")) for i in range(2)]
+        await asyncio.sleep(0.05)
+        assert limits["registration"].in_flight == 2
+
+        resp = await asyncio.wait_for(client.post("/events/9/register"), 1)
+        assert resp.status_code == 503
+        assert resp.headers["retry-after"] == "3"
+        assert "busy" in resp.json()["detail"]
+        assert LOAD_SHED.value("registration") == shed + 1
+        # Other route classes are not held back
+        assert (await client.post("/events/")).status_code == 200
+
+        gate.set()
+        assert [r.status_code for r in await asyncio.gather(*admitted)] == [200, 200]
+    assert limits["registration"].in_flight == 0
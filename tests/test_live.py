@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from app.live import Broadcaster
+
+
+class FakeEvent:
+    def __init__(self):
+        self.version = 1
+        self.loads = 0
+
+    async def load(self, event_id):
+        self.loads += 1
+        return {"event_id": event_id, "registered": self.version - 1, "version": self.version}
+
+
+@pytest.mark.asyncio
+async def test_burst_of_changes_is_coalesced():
+    event = FakeEvent()
+    broadcaster = Broadcaster(interval=0.05, load=event.load)
+    subscriptions = [broadcaster.subscribe(1) for _ in range(3)]
+    for _ in range(500):
+        event.version += 1
+        broadcaster.changed(1)
+    states = await asyncio.gather(*(subscription.get(1) for subscription in subscriptions))
+    assert event.loads == 1
+    assert all(state["version"] == 501 for state in states)
+
+
+@pytest.mark.asyncio
+async def test_only_watched_events_are_loaded_and_older_states_are_dropped():
+    event = FakeEvent()
+    broadcaster = Broadcaster(interval=0, load=event.load)
+    broadcaster.changed(2)
+    assert event.loads == 0
+    subscription = broadcaster.subscribe(2)
+    subscription.put({"version": 5})
+    subscription.put({"version": 4})
+    assert (await subscription.get(1)) == {"version": 5}
+    with pytest.raises(asyncio.TimeoutError):
+        await subscription.get(0.01)
+    broadcaster.unsubscribe(subscription)
+    broadcaster.unsubscribe(subscription)
+    broadcaster.changed(2)
+    assert event.loads == 0
@@ -0,0 +1,63 @@
+import asyncio
+import uuid
+
+import asyncpg
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import crud
+from app.config import get_settings
+from app.invalidation import listen_dsn
+
+BASE_URL = "http://localhost:8000"
+
+
+@pytest.mark.asyncio
+async def test_cancel_locks_the_event_before_the_registration():
+    # register_attendee locks the event and then inserts the registration; a
+    # cancel taking the registration row first would deadlock against it
+    try:
+        holder = await asyncpg.connect(listen_dsn(get_settings().database_url), timeout=5)
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError):
+        pytest.skip("DATABASE_URL is not reachable")
+    probe = await asyncpg.connect(listen_dsn(get_settings().database_url), timeout=5)
+    engine = create_async_engine(get_settings().database_url)
+    try:
+        async with AsyncClient(base_url=BASE_URL) as ac:
+            resp = await ac.post("/events/", json={
+                "name": "Lock Order Event",
+                "location": "Lock City",
+                "start_time": "2031-06-01T10:00:00+05:30",
+                "end_time": "2031-06-01T12:00:00+05:30",
+                "max_capacity": 10
+            })
+            event_id = resp.json()["id"]
+            resp = await ac.post(f"/events/{event_id}/register",
+                                 json={"name": "Locked", "email": f"lock-{uuid.uuid4().hex[:8]}@example.com"})
+            registration_id, attendee_id = resp.json()["id"], resp.json()["attendee_id"]
+
+        # Stand in for a registration holding the event row
+        transaction = holder.transaction()
+        await transaction.start()
+        await holder.execute("SELECT id FROM events WHERE id = $1 FOR UPDATE", event_id)
+
+        async def cancel():
+            async with AsyncSession(engine) as db:
+                return await crud.cancel_registration(db, event_id, attendee_id)
+
+        cancelling = asyncio.create_task(cancel())
+        await asyncio.sleep(0.3)
+        assert not cancelling.done()
+        # The waiting cancel must not hold the registration row yet
+        async with probe.transaction():
+            locked = await probe.fetchval("SELECT id FROM registrations WHERE id = $1 FOR UPDATE NOWAIT",
+                                          registration_id)
+        assert locked == registration_id
+
+        await transaction.rollback()
+        assert await asyncio.wait_for(cancelling, 5) is True
+    finally:
+        await holder.close()
+        await probe.close()
+        await engine.dispose()
@@ -1,3 +1,7 @@
+import asyncio
+import base64
+import json
+import uuid
 import pytest
 from httpx import AsyncClient
 from datetime import datetime, timedelta, timezone
@@ -134,7 +138,7 @@ async def test_list_events_pagination():
             })
 
         # Get first page, size 5
-        resp = await ac.get("/events/?page=1&size=5")
+        resp = await ac.get("/events/?page=1&size=5&include_total=true")
         assert resp.status_code == 200
         data = resp.json()
         assert "total" in data and "page" in data and "size" in data and "events" in data
@@ -229,6 +233,10 @@ async def test_list_attendees_for_nonexistent_event():
     async with AsyncClient(base_url=BASE_URL) as ac:
         resp = await ac.get(f"/events/999999/attendees")
         assert resp.status_code == 404
+        # Answered from the negative cache the second time
+        resp = await ac.get(f"/events/999999/attendees")
+        assert resp.status_code == 404
+        assert 'desc="0 queries"' in resp.headers["server-timing"]
 
 @pytest.mark.asyncio
 async def test_list_attendees():
@@ -285,3 +293,501 @@ async def test_event_input_validation():
             "email": "not-an-email"
         })
         assert resp2.status_code == 422
+
+@pytest.mark.asyncio
+async def test_list_events_pages_are_ordered_and_disjoint():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        for i in range(4):
+            start_time = (datetime.now(timezone.utc) + timedelta(days=30, hours=i)).isoformat()
+            end_time = (datetime.now(timezone.utc) + timedelta(days=30, hours=i + 1)).isoformat()
+            await ac.post("/events/", json={
+                "name": f"Ordered Event {i}",
+                "location": "Order City",
+                "start_time": start_time,
+                "end_time": end_time,
+                "max_capacity": 10
+            })
+        page1 = (await ac.get("/events/?page=1&size=3&timezone=UTC&include_total=true")).json()
+        page2 = (await ac.get("/events/?page=2&size=3&timezone=UTC&include_total=true")).json()
+        assert page1["total"] == page2["total"] >= 4
+        ids1 = {e["id"] for e in page1["events"]}
+        ids2 = {e["id"] for e in page2["events"]}
+        assert not ids1 & ids2
+        starts = [e["start_time"] for e in page1["events"] + page2["events"]]
+        assert starts == sorted(starts)
+
+@pytest.mark.asyncio
+async def test_list_attendees_cursor_pagination():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        event_resp = await ac.post("/events/", json={
+            "name": "Cursor Event",
+            "location": "Cursor City",
+            "start_time": "2024-06-01T10:00:00+05:30",
+            "end_time": "2024-06-01T12:00:00+05:30",
+            "max_capacity": 10
+        })
+        event_id = event_resp.json()["id"]
+        for i in range(5):
+            await ac.post(f"/events/{event_id}/register", json={
+                "name": f"Cursor{i}",
+                "email": f"cursor{i}@example.com"
+            })
+        seen = []
+        resp = await ac.get(f"/events/{event_id}/attendees?size=2")
+        data = resp.json()
+        assert data["total"] == 5
+        seen += [a["email"] for a in data["attendees"]]
+        while data["next_cursor"]:
+            resp = await ac.get(f"/events/{event_id}/attendees?size=2&after={data['next_cursor']}")
+            assert resp.status_code == 200
+            data = resp.json()
+            # Cursor pages skip the count unless asked for
+            assert data["total"] is None
+            seen += [a["email"] for a in data["attendees"]]
+        assert seen == [f"cursor{i}@example.com" for i in range(5)]
+        resp = await ac.get(f"/events/{event_id}/attendees?size=2&after=not-a-cursor")
+        assert resp.status_code == 400
+        # Well-formed cursors whose id doesn't fit the column are just as invalid
+        for registration_id in (99999999999, 0):
+            cursor = base64.urlsafe_b64encode(f"r:{registration_id}".encode()).decode().rstrip("=")
+            resp = await ac.get(f"/events/{event_id}/attendees", params={"size": 2, "after": cursor})
+            assert resp.status_code == 400
+            assert resp.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_registrations_do_not_overbook():
+    async with AsyncClient(base_url=BASE_URL, timeout=60) as ac:
+        event_resp = await ac.post("/events/", json={
+            "name": "Flash Sale Event",
+            "location": "Rush City",
+            "start_time": "2024-06-01T10:00:00+05:30",
+            "end_time": "2024-06-01T12:00:00+05:30",
+            "max_capacity": 100
+        })
+        event_id = event_resp.json()["id"]
+        responses = await asyncio.gather(*[
+            ac.post(f"/events/{event_id}/register", json={
+                "name": f"Rush{i}",
+                "email": f"rush{i}@example.com"
+            })
+            for i in range(1000)
+        ])
+        statuses = [r.status_code for r in responses]
+        assert statuses.count(201) == 100
+        assert statuses.count(400) == 900
+        assert all("fully booked" in r.json()["detail"].lower() for r in responses if r.status_code == 400)
+        resp = await ac.get(f"/events/{event_id}/attendees?size=1")
+        assert resp.json()["total"] == 100
+
+@pytest.mark.asyncio
+async def test_seats_remaining_and_available_only():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        start_time = (datetime.now(timezone.utc) + timedelta(days=400)).isoformat()
+        end_time = (datetime.now(timezone.utc) + timedelta(days=400, hours=2)).isoformat()
+        event_resp = await ac.post("/events/", json={
+            "name": "Seats Event",
+            "location": "Seat City",
+            "start_time": start_time,
+            "end_time": end_time,
+            "max_capacity": 1
+        })
+        event = event_resp.json()
+        assert event["seats_remaining"] == 1
+        reg_resp = await ac.post(f"/events/{event['id']}/register", json={
+            "name": "Sam",
+            "email": "sam.seats@example.com"
+        })
+        attendee_id = reg_resp.json()["attendee_id"]
+        resp = await ac.get("/events/?available_only=true&size=100")
+        assert event["id"] not in [e["id"] for e in resp.json()["events"]]
+        # Cancelling frees the seat again
+        resp = await ac.delete(f"/events/{event['id']}/attendees/{attendee_id}")
+        assert resp.status_code == 204
+        resp = await ac.delete(f"/events/{event['id']}/attendees/{attendee_id}")
+        assert resp.status_code == 404
+        resp = await ac.get("/events/?available_only=true&size=100")
+        listed = {e["id"]: e for e in resp.json()["events"]}
+        assert listed[event["id"]]["seats_remaining"] == 1
+
+@pytest.mark.asyncio
+async def test_bulk_register():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        event_resp = await ac.post("/events/", json={
+            "name": "Bulk Event",
+            "location": "Bulk City",
+            "start_time": "2024-06-01T10:00:00+05:30",
+            "end_time": "2024-06-01T12:00:00+05:30",
+            "max_capacity": 3
+        })
+        event_id = event_resp.json()["id"]
+        await ac.post(f"/events/{event_id}/register", json={
+            "name": "Early",
+            "email": "bulk0@example.com"
+        })
+        rows = [{"name": f"Bulk{i}", "email": f"bulk{i}@example.com"} for i in range(4)]
+        rows.insert(2, {"name": "Again", "email": "bulk1@example.com"})
+        rows.append({"name": "Broken", "email": "not-an-email"})
+        resp = await ac.post(f"/events/{event_id}/register/bulk", json=rows)
+        assert resp.status_code == 200
+        data = resp.json()
+        assert [r["status"] for r in data["results"]] == [
+            "duplicate", "created", "duplicate", "created", "full", "invalid"
+        ]
+        assert (data["created"], data["duplicate"], data["full"], data["invalid"]) == (2, 2, 1, 1)
+        # NDJSON body, event is now full
+        ndjson = '{"name": "Late", "email": "bulk9@example.com"}\n'
+        resp = await ac.post(f"/events/{event_id}/register/bulk", content=ndjson,
+                             headers={"Content-Type": "application/x-ndjson"})
+        assert resp.json()["full"] == 1
+        resp = await ac.get(f"/events/{event_id}/attendees")
+        assert resp.json()["total"] == 3
+        resp = await ac.post("/events/999999/register/bulk", json=rows)
+        assert resp.status_code == 404
+
+@pytest.mark.asyncio
+async def test_concurrent_bulk_imports_sharing_attendees():
+    # Two imports for different events listing the same new people in opposite
+    # orders must not deadlock on the attendee rows
+    async with AsyncClient(base_url=BASE_URL, timeout=60) as ac:
+        event_ids = []
+        for _ in range(2):
+            resp = await ac.post("/events/", json={
+                "name": "Shared Bulk Event",
+                "location": "Bulk City",
+                "start_time": "2031-06-01T10:00:00+05:30",
+                "end_time": "2031-06-01T12:00:00+05:30",
+                "max_capacity": 10_000
+            })
+            event_ids.append(resp.json()["id"])
+        for attempt in range(3):
+            token = uuid.uuid4().hex[:8]
+            rows = [{"name": f"Shared{i}", "email": f"shared-{token}-{i:04}@example.com"} for i in range(1500)]
+            responses = await asyncio.gather(
+                ac.post(f"/events/{event_ids[0]}/register/bulk", json=rows),
+                ac.post(f"/events/{event_ids[1]}/register/bulk", json=rows[::-1]),
+            )
+            assert [r.status_code for r in responses] == [200, 200]
+            assert [r.json()["created"] for r in responses] == [1500, 1500]
+
+@pytest.mark.asyncio
+async def test_export_attendees():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        event_resp = await ac.post("/events/", json={
+            "name": "Export Event",
+            "location": "Export City",
+            "start_time": "2024-06-01T10:00:00+05:30",
+            "end_time": "2024-06-01T12:00:00+05:30",
+            "max_capacity": 5
+        })
+        event_id = event_resp.json()["id"]
+        for i in range(3):
+            await ac.post(f"/events/{event_id}/register", json={
+                "name": f"Export{i}",
+                "email": f"export{i}@example.com"
+            })
+        resp = await ac.get(f"/events/{event_id}/attendees/export?format=csv")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/csv")
+        lines = resp.text.strip().splitlines()
+        assert lines[0] == "id,name,email"
+        assert [line.split(",")[2] for line in lines[1:]] == [f"export{i}@example.com" for i in range(3)]
+        resp = await ac.get(f"/events/{event_id}/attendees/export?format=ndjson")
+        assert len(resp.text.strip().splitlines()) == 3
+        resp = await ac.get("/events/999999/attendees/export")
+        assert resp.status_code == 404
+
+@pytest.mark.asyncio
+async def test_readiness():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        resp = await ac.get("/internal/ready")
+        assert resp.status_code == 200
+        assert resp.json() == {"status": "ready"}
+
+@pytest.mark.asyncio
+async def test_pool_stats_endpoint():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        before = (await ac.get("/internal/pool")).json()["primary"]
+        await asyncio.gather(*[ac.get("/events/", params={"page": i}) for i in range(1, 21)])
+        resp = await ac.get("/internal/pool")
+        assert resp.status_code == 200
+        body = resp.json()
+        primary = body["primary"]
+        assert set(primary) == {"pool_size", "checked_in", "checked_out", "overflow", "checkouts",
+                                "checkout_timeouts", "avg_wait_ms", "max_wait_ms"}
+        assert primary["checkouts"] >= before["checkouts"] + 20
+        assert primary["checked_out"] == 0
+        assert body["replicas"] == []
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        event_resp = await ac.post("/events/", json={
+            "name": "Metrics Event",
+            "location": "Metrics City",
+            "start_time": "2024-06-01T10:00:00+05:30",
+            "end_time": "2024-06-01T12:00:00+05:30",
+            "max_capacity": 1
+        })
+        event_id = event_resp.json()["id"]
+        for email in ("metrics1@example.com", "metrics1@example.com", "metrics2@example.com"):
+            await ac.post(f"/events/{event_id}/register", json={"name": "Metrics", "email": email})
+        resp = await ac.get("/metrics")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        text = resp.text
+        for result in ("accepted", "duplicate", "full"):
+            assert f'registrations_total{{result="{result}"}}' in text
+        assert "events_created_total" in text
+        assert 'route="/events/{event_id}/register"' in text
+        assert f"/events/{event_id}/register" not in text
+        assert 'db_pool_connections{engine="primary",state="checked_out"}' in text
+        for cache in ("event", "sold_out"):
+            assert f'cache_hits_total{{cache="{cache}"}}' in text
+            assert f'cache_misses_total{{cache="{cache}"}}' in text
+            assert f'cache_entries{{cache="{cache}"}}' in text
+
+@pytest.mark.asyncio
+async def test_sold_out_event_reopens_after_cancel():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        event_resp = await ac.post("/events/", json={
+            "name": "Rush Event",
+            "location": "Rush City",
+            "start_time": "2024-06-01T10:00:00+05:30",
+            "end_time": "2024-06-01T12:00:00+05:30",
+            "max_capacity": 1
+        })
+        event_id = event_resp.json()["id"]
+        first = await ac.post(f"/events/{event_id}/register", json={"name": "First", "email": "rush1@example.com"})
+        assert first.status_code == 201
+        # Retries and latecomers are rejected with the usual errors
+        for _ in range(3):
+            resp = await ac.post(f"/events/{event_id}/register", json={"name": "Late", "email": "rush2@example.com"})
+            assert resp.status_code == 400
+            assert "fully booked" in resp.json()["detail"].lower()
+        resp = await ac.delete(f"/events/{event_id}/attendees/{first.json()['attendee_id']}")
+        assert resp.status_code == 204
+        # The cancelled attendee can register again: filter hits are confirmed
+        resp = await ac.post(f"/events/{event_id}/register", json={"name": "First", "email": "rush1@example.com"})
+        assert resp.status_code == 201
+        resp = await ac.post(f"/events/{event_id}/register", json={"name": "First", "email": "rush1@example.com"})
+        assert resp.status_code == 400
+
+@pytest.mark.asyncio
+async def test_search_and_filter_events():
+    # A per-run word in every name and location keeps the exact assertions to this run's events
+    token = f"run{uuid.uuid4().hex[:8]}"
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        base = datetime.now(timezone.utc) + timedelta(days=500)
+        for i, (name, location) in enumerate([
+            (f"Zephyr {token} Quartet Live", f"Oslo {token} Concert Hall"),
+            (f"Zephyr {token} Jazz Night", f"Bergen {token}"),
+            (f"Quarterly {token} Review", f"Oslo {token}"),
+        ]):
+            await ac.post("/events/", json={
+                "name": name,
+                "location": location,
+                "start_time": (base + timedelta(days=i)).isoformat(),
+                "end_time": (base + timedelta(days=i, hours=2)).isoformat(),
+                "max_capacity": 10
+            })
+        quartet, jazz, review = (f"Zephyr {token} Quartet Live", f"Zephyr {token} Jazz Night",
+                                 f"Quarterly {token} Review")
+        resp = await ac.get("/events/", params={"q": f"zephyr {token}", "size": 100, "include_total": "true"})
+        data = resp.json()
+        assert set(data) == {"total", "page", "size", "events"}
+        assert [e["name"] for e in data["events"]] == [quartet, jazz]
+        assert data["total"] == 2
+        # The total is only counted when asked for
+        resp = await ac.get("/events/", params={"q": f"zephyr {token}", "size": 100})
+        assert resp.json()["total"] is None
+        assert len(resp.json()["events"]) == 2
+        # Prefix match on any word of the name or location
+        resp = await ac.get("/events/", params={"q": f"zeph oslo {token}", "size": 100})
+        assert [e["name"] for e in resp.json()["events"]] == [quartet]
+        resp = await ac.get("/events/", params={"q": f"zephyr {token}", "sort": "-start_time", "size": 100})
+        assert [e["name"] for e in resp.json()["events"]] == [jazz, quartet]
+        resp = await ac.get("/events/", params={"q": f"zephyr {token}", "sort": "name", "size": 100})
+        assert [e["name"] for e in resp.json()["events"]] == [jazz, quartet]
+        resp = await ac.get("/events/", params={"location": f"OSLO {token.upper()}", "size": 100})
+        assert [e["name"] for e in resp.json()["events"]] == [review]
+        window = {"from": (base + timedelta(hours=12)).isoformat(), "to": (base + timedelta(days=1, hours=12)).isoformat()}
+        resp = await ac.get("/events/", params={"q": f"zephyr {token}", **window})
+        assert [e["name"] for e in resp.json()["events"]] == [jazz]
+        resp = await ac.get("/events/", params={"from": window["to"], "to": window["from"]})
+        assert resp.status_code == 422
+        resp = await ac.get("/events/", params={"sort": "capacity"})
+        assert resp.status_code == 422
+        # A query with nothing to search for is not the same as no query
+        resp = await ac.get("/events/", params={"q": "!!!"})
+        assert resp.status_code == 422
+
+@pytest.mark.asyncio
+async def test_conditional_get_listings():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        start = datetime.now(timezone.utc) + timedelta(days=800)
+        event_resp = await ac.post("/events/", json={
+            "name": "Polled Event",
+            "location": "Dashboard City",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=2)).isoformat(),
+            "max_capacity": 10
+        })
+        event_id = event_resp.json()["id"]
+        listing = {"q": "polled dashboard", "size": 100}
+        resp = await ac.get("/events/", params=listing)
+        etag = resp.headers["etag"]
+        assert resp.headers["cache-control"] == "no-cache"
+        resp = await ac.get("/events/", params=listing, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["etag"] == etag
+        assert resp.content == b""
+
+        attendees_url = f"/events/{event_id}/attendees"
+        resp = await ac.get(attendees_url)
+        attendees_etag, last_modified = resp.headers["etag"], resp.headers["last-modified"]
+        resp = await ac.get(attendees_url, headers={"If-None-Match": attendees_etag})
+        assert resp.status_code == 304
+        resp = await ac.get(attendees_url, headers={"If-Modified-Since": last_modified})
+        assert resp.status_code == 304
+        # Dates that aren't valid HTTP dates are ignored, including zone-less ones
+        for since in ("Sun, 06 Nov 2040 08:49:37 -0000", "not a date"):
+            resp = await ac.get(attendees_url, headers={"If-Modified-Since": since})
+            assert resp.status_code == 200
+        # Other pages have their own validators
+        resp = await ac.get(attendees_url, params={"page": 2}, headers={"If-None-Match": attendees_etag})
+        assert resp.status_code == 200
+
+        # A registration changes both listings (the seats remaining moved)
+        await ac.post(f"/events/{event_id}/register", json={"name": "Poller", "email": "poller@example.com"})
+        resp = await ac.get("/events/", params=listing, headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["etag"] != etag
+        assert resp.json()["events"][0]["seats_remaining"] == 9
+        resp = await ac.get(attendees_url, headers={"If-None-Match": attendees_etag})
+        assert resp.status_code == 200
+        assert resp.json()["total"] == 1
+
+async def next_sse(lines):
+    """Read one Server-Sent Event (skipping keepalive comments) as {field: value}."""
+    message = {}
+    async for line in lines:
+        if not line:
+            if message:
+                return message
+        elif not line.startswith(":"):
+            field, _, value = line.partition(": ")
+            message[field] = value
+
+@pytest.mark.asyncio
+async def test_live_seats_stream():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        start = datetime.now(timezone.utc) + timedelta(days=700)
+        event_resp = await ac.post("/events/", json={
+            "name": "Live Event",
+            "location": "Live City",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=2)).isoformat(),
+            "max_capacity": 50
+        })
+        event_id = event_resp.json()["id"]
+        resp = await ac.get("/events/999999/live")
+        assert resp.status_code == 404
+        async with ac.stream("GET", f"/events/{event_id}/live", timeout=10) as stream:
+            assert stream.headers["content-type"].startswith("text/event-stream")
+            lines = stream.aiter_lines()
+            first = await next_sse(lines)
+            assert first["event"] == "seats"
+            assert json.loads(first["data"])["seats_remaining"] == 50
+            # A burst of registrations arrives as a few merged updates
+            await asyncio.gather(*(
+                ac.post(f"/events/{event_id}/register", json={"name": "Live", "email": f"live{i}@example.com"})
+                for i in range(20)
+            ))
+            updates = []
+            while not updates or updates[-1]["seats_remaining"] > 30:
+                updates.append(json.loads((await asyncio.wait_for(next_sse(lines), 5))["data"]))
+            assert updates[-1]["registered"] == 20
+            assert len(updates) < 20
+
+@pytest.mark.asyncio
+async def test_idempotency_key_replays_registration():
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        event = {
+            "name": "Retry Event",
+            "location": "Flaky City",
+            "start_time": "2031-06-01T10:00:00+05:30",
+            "end_time": "2031-06-01T12:00:00+05:30",
+            "max_capacity": 5
+        }
+        created = await ac.post("/events/", json=event, headers={"Idempotency-Key": "create-retry-event"})
+        again = await ac.post("/events/", json=event, headers={"Idempotency-Key": "create-retry-event"})
+        assert created.status_code == again.status_code == 201
+        assert again.json()["id"] == created.json()["id"]
+        event_id = created.json()["id"]
+
+        key = {"Idempotency-Key": "register-retry-1"}
+        reg = {"name": "Flaky", "email": "flaky@example.com"}
+        responses = await asyncio.gather(*[ac.post(f"/events/{event_id}/register", json=reg, headers=key)
+                                           for _ in range(3)])
+        assert [r.status_code for r in responses] == [201, 201, 201]
+        assert len({r.json()["attendee_id"] for r in responses}) == 1
+        retry = await ac.post(f"/events/{event_id}/register", json=reg, headers=key)
+        assert retry.status_code == 201
+        assert retry.headers["idempotent-replayed"] == "true"
+        # Answered without running any SQL
+        assert "server-timing" not in retry.headers
+        resp = await ac.get(f"/events/{event_id}/attendees")
+        assert resp.json()["total"] == 1
+
+@pytest.mark.asyncio
+async def test_events_batch_and_sparse_fields():
+    location = f"Batch City {uuid.uuid4().hex[:8]}"
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        ids = []
+        for i in range(3):
+            resp = await ac.post("/events/", json={
+                "name": f"Batch Event {i}",
+                "location": location,
+                "start_time": "2032-03-01T10:00:00+00:00",
+                "end_time": "2032-03-01T12:00:00+00:00",
+                "max_capacity": 10
+            })
+            ids.append(resp.json()["id"])
+        missing = max(ids) + 1000
+        resp = await ac.get("/events/batch", params={"ids": f"{ids[2]},{missing},{ids[0]},{ids[2]}",
+                                                     "timezone": "UTC"})
+        assert resp.status_code == 200
+        body = resp.json()
+        assert [event["id"] for event in body["events"]] == [ids[2], ids[0]]
+        assert body["events"][0]["name"] == "Batch Event 2"
+        assert body["events"][0]["seats_remaining"] == 10
+        assert body["events"][0]["start_time"].startswith("2032-03-01T10:00:00")
+        assert body["missing"] == [missing]
+
+        resp = await ac.get("/events/batch", params={"ids": str(ids[1]), "fields": "name,seats_remaining"})
+        assert resp.json()["events"] == [{"name": "Batch Event 1", "seats_remaining": 10}]
+        assert (await ac.get("/events/batch", params={"ids": "1,x"})).status_code == 422
+        assert (await ac.get("/events/batch", params={"ids": "1,99999999999"})).status_code == 422
+        assert (await ac.get("/events/batch", params={"ids": "0"})).status_code == 422
+        assert (await ac.get("/events/batch", params={"ids": ",".join(map(str, range(1, 102)))})).status_code == 422
+
+        resp = await ac.get("/events/", params={"location": location, "fields": "id,start_time",
+                                                "timezone": "UTC"})
+        assert resp.status_code == 200
+        events = resp.json()["events"]
+        assert [set(event) for event in events] == [{"id", "start_time"}] * 3
+        assert events[0]["start_time"].startswith("2032-03-01T10:00:00")
+        assert (await ac.get("/events/", params={"fields": "id,secret"})).status_code == 422
+
+        await ac.post(f"/events/{ids[0]}/register", json={"name": "Sparse", "email": "sparse@example.com"})
+        resp = await ac.get(f"/events/{ids[0]}/attendees", params={"fields": "email"})
+        assert resp.status_code == 200
+        assert resp.json()["attendees"] == [{"email": "sparse@example.com"}]
+        assert resp.json()["total"] == 1
+        etag = resp.headers["etag"]
+        full = await ac.get(f"/events/{ids[0]}/attendees", headers={"If-None-Match": etag})
+        assert full.status_code == 200
+        sparse = await ac.get(f"/events/{ids[0]}/attendees", params={"fields": "email"},
+                              headers={"If-None-Match": etag})
+        assert sparse.status_code == 304
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.limits import AdaptiveLimit, ConcurrencyLimitMiddleware
+from app.metrics import Counter, Histogram, MetricsMiddleware, REQUEST_DURATION
+
+
+def test_counter_renders_labels():
+    counter = Counter("test_things_total", "Things", ["kind"])
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    counter.inc('b"c')
+    assert counter.render().splitlines() == [
+        "# HELP test_things_total Things",
+        "# TYPE test_things_total counter",
+        'test_things_total{kind="a"} 3',
+        'test_things_total{kind="b\\"c"} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    samples = histogram.samples()
+    assert samples[:3] == [
+        'test_latency_seconds_bucket{le="0.1"} 2',
+        'test_latency_seconds_bucket{le="1.0"} 3',
+        'test_latency_seconds_bucket{le="+Inf"} 4',
+    ]
+    assert samples[4] == "test_latency_seconds_count 4"
+
+
+@pytest.mark.asyncio
+async def test_middleware_records_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/things/{thing_id}")
+    async def get_thing(thing_id: int):
+        return {"id": thing_id}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        for thing_id in (1, 2, 3):
+            await client.get(f"/things/{thing_id}")
+        await client.get("/nowhere")
+
+    rendered = REQUEST_DURATION.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="/things/{thing_id}",status="200"} 3' in rendered
+    assert 'route="unmatched",status="404"' in rendered
+    assert "/things/1" not in rendered
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_requests_answered_before_routing():
+    # Shed and replayed requests never reach the router, but still belong to a route
+    gate = asyncio.Event()
+    app = FastAPI()
+
+    @app.post("/events/{event_id}/register")
+    async def register(event_id: int):
+        await gate.wait()
+        return {"event_id": event_id}
+
+    @app.post("/events/", status_code=201)
+    async def create():
+        return {}
+
+    limits = {"registration": AdaptiveLimit("registration", initial=1, min_limit=1, latency_target=10)}
+    app.add_middleware(ConcurrencyLimitMiddleware, limits=limits)
+    app.add_middleware(IdempotencyMiddleware, store=IdempotencyStore(maxsize=10, ttl=60))
+    app.add_middleware(MetricsMiddleware)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        admitted = asyncio.create_task(client.post("/events/1/register"))
+        await asyncio.sleep(0.05)
+        assert (await client.post("/events/2/register")).status_code == 503
+        gate.set()
+        await admitted
+        for _ in range(2):
+            resp = await client.post("/events/", headers={"Idempotency-Key": "metrics"})
+        assert resp.headers["idempotent-replayed"] == "true"
+
+    rendered = REQUEST_DURATION.render()
+    assert 'http_request_duration_seconds_count{method="POST",route="/events/{event_id}/register",status="503"} 1' in rendered
+    assert 'http_request_duration_seconds_count{method="POST",route="/events/",status="201"} 2' in rendered
+    assert 'route="unmatched",status="503"' not in rendered
@@ -0,0 +1,157 @@
+"""EXPLAIN every query the crud layer issues against a seeded database.
+
+Seeds a realistically shaped dataset inside a transaction that is rolled back
+at the end, runs the crud functions while recording their SQL, and fails if
+any plan reads one of the large tables with a sequential scan. Needs
+DATABASE_URL to point at a migrated Postgres database; skipped otherwise.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import DateTime, Integer, bindparam, event, exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import crud
+from app.config import get_settings
+from app.schemas import RegistrationCreate
+
+LARGE_TABLES = {"events", "attendees", "registrations"}
+
+PAST_EVENTS = 20_000
+UPCOMING_EVENTS = 500
+ATTENDEES = 50_000
+REGISTRATIONS_PER_EVENT = 5
+
+
+def seq_scans(plan: dict) -> list:
+    """Relations read by a Seq Scan anywhere in a JSON plan tree."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in LARGE_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def seed(conn) -> dict:
+    """Most events are in the past, as on a long-running deployment."""
+    now = datetime.now(timezone.utc)
+    await conn.execute(text("""
+        INSERT INTO events (name, location, start_time, end_time, max_capacity, registered_count)
+        SELECT 'event ' || n, 'hall ' || (n % 50),
+               :now + make_interval(hours => n - :past), :now + make_interval(hours => n - :past + 2),
+               100, 0
+        FROM generate_series(1, :past + :upcoming) AS n
+    """).bindparams(bindparam("now", type_=DateTime(timezone=True)), bindparam("past", type_=Integer),
+                      bindparam("upcoming", type_=Integer)), {"now": now, "past": PAST_EVENTS, "upcoming": UPCOMING_EVENTS})
+    await conn.execute(text("""
+        INSERT INTO attendees (name, email)
+        SELECT 'attendee ' || n, 'plan-' || n || '@example.com' FROM generate_series(1, :n) AS n
+    """), {"n": ATTENDEES})
+    # Every event gets a few registrations; one upcoming event gets a full house
+    await conn.execute(text("""
+        INSERT INTO registrations (event_id, attendee_id)
+        SELECT e.id, a.id
+        FROM events AS e
+        CROSS JOIN generate_series(0, :per - 1) AS k
+        JOIN (SELECT id, row_number() OVER (ORDER BY id) AS rn FROM attendees WHERE email LIKE 'plan-%') AS a
+          ON a.rn = (e.id * :per + k) % :attendees + 1
+        ON CONFLICT DO NOTHING
+    """), {"per": REGISTRATIONS_PER_EVENT, "attendees": ATTENDEES})
+    busy_event = (await conn.execute(
+        text("SELECT id FROM events WHERE start_time > :now ORDER BY start_time LIMIT 1"), {"now": now}
+    )).scalar_one()
+    await conn.execute(text("""
+        INSERT INTO registrations (event_id, attendee_id)
+        SELECT :event_id, id FROM attendees WHERE email LIKE 'plan-%' ORDER BY id LIMIT 100
+        ON CONFLICT DO NOTHING
+    """), {"event_id": busy_event})
+    await conn.execute(text("""
+        UPDATE events SET registered_count = counts.n
+        FROM (SELECT event_id, count(*) AS n FROM registrations GROUP BY event_id) AS counts
+        WHERE events.id = counts.event_id
+    """))
+    quiet_event = (await conn.execute(
+        text("SELECT id FROM events WHERE start_time > :now AND id <> :busy ORDER BY start_time LIMIT 1"),
+        {"now": now, "busy": busy_event},
+    )).scalar_one()
+    attendee_id = (await conn.execute(
+        text("SELECT attendee_id FROM registrations WHERE event_id = :id LIMIT 1"), {"id": quiet_event}
+    )).scalar_one()
+    await conn.execute(text("ANALYZE events, attendees, registrations"))
+    return {"busy_event": busy_event, "quiet_event": quiet_event, "attendee_id": attendee_id}
+
+
+async def exercise_crud(db: AsyncSession, ids: dict) -> None:
+    busy, quiet = ids["busy_event"], ids["quiet_event"]
+    await crud.get_events(db, skip=0, limit=10)
+    await crud.get_events(db, skip=100, limit=10, available_only=True)
+    await crud.count_events(db)
+    await crud.count_events(db, available_only=True)
+    await crud.get_events(db, q="event 2041", sort="-start_time")
+    await crud.count_events(db, q="event 2041")
+    await crud.get_events(db, location="Hall 7", sort="name")
+    await crud.get_event_versions(db, skip=100, limit=10, available_only=True)
+    await crud.get_event(db, quiet)
+    await crud.get_events_by_ids(db, [busy, quiet, 0])
+    await crud.get_events(db, skip=100, limit=10, fields=["name", "seats_remaining"])
+    await crud.get_event_version(db, busy)
+    await crud.get_attendee_by_email(db, "plan-42@example.com")
+    await crud.is_registered(db, busy, "plan-42@example.com")
+    await crud.get_attendees_for_event(db, busy, skip=20, limit=11)
+    await crud.get_attendees_for_event(db, busy, limit=11, after_id=1)
+    await crud.get_attendees_for_event(db, busy, limit=11, after_id=1, fields=["email"])
+    async for _ in crud.stream_attendees_for_event(db, busy, batch_size=50):
+        pass
+    await crud.count_attendees_for_event(db, busy)
+    await crud.register_attendee(db, quiet, RegistrationCreate(name="Plan", email="plan-new@example.com"))
+    await crud.bulk_register_attendees(db, quiet, [
+        RegistrationCreate(name="Plan", email=f"plan-{n}@example.com") for n in (1, 2, 999_999)
+    ])
+    await crud.cancel_registration(db, quiet, ids["attendee_id"])
+    archived, _ = await crud.archive_events(db, datetime.now(timezone.utc) - timedelta(days=30), batch_size=100)
+    await crud.get_event_version(db, archived[0], archived=True)
+    await crud.get_attendees_for_event(db, archived[0], limit=11, archived=True)
+
+
+@pytest.mark.asyncio
+async def test_crud_queries_avoid_sequential_scans():
+    engine = create_async_engine(get_settings().database_url, poolclass=NullPool)
+    try:
+        conn = await engine.connect()
+    except (OSError, exc.DBAPIError):
+        await engine.dispose()
+        pytest.skip("DATABASE_URL is not reachable")
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("EXPLAIN", "SAVEPOINT", "RELEASE", "ROLLBACK", "SET")):
+            statements.append((statement, parameters))
+
+    try:
+        transaction = await conn.begin()
+        ids = await seed(conn)
+        event.listen(conn.sync_connection, "before_cursor_execute", record)
+        # crud commits and rollbacks become savepoints of the seeding transaction
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        await exercise_crud(db, ids)
+        await db.close()
+        event.remove(conn.sync_connection, "before_cursor_execute", record)
+
+        offenders = []
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            scanned = seq_scans(plan[0]["Plan"])
+            if scanned:
+                offenders.append(f"Seq Scan on {', '.join(scanned)}:\n{statement}")
+        await transaction.rollback()
+    finally:
+        await conn.close()
+        await engine.dispose()
+
+    assert statements, "no statements were recorded"
+    assert not offenders, "\n\n".join(offenders)